@@ -0,0 +1,93 @@
+import base64
+import json
+import logging
+import os
+import threading
+import time
+
+token_ttl_ = float(os.environ.get("MEROSHARE_TOKEN_TTL", 10 * 60))
+token_file = os.environ.get("MEROSHARE_TOKEN_FILE")
+token_key = os.environ.get("MEROSHARE_TOKEN_KEY")
+
+
+def token_expiry(token, ttl: float = token_ttl_):
+    # MeroShare hands out JWTs; use their own expiry when it can be read and
+    # fall back to a conservative TTL otherwise.
+    try:
+        payload = token.split()[-1].split(".")[1]
+        payload += "=" * (-len(payload) % 4)
+        return float(json.loads(base64.urlsafe_b64decode(payload))["exp"])
+    except Exception:
+        return time.time() + ttl
+
+
+class TokenStore:
+    def __init__(self, path: str = None, key: str = None, margin: float = 30):
+        self.path = path
+        self.margin = margin
+        self.__lock = threading.Lock()
+        self.__tokens = {}
+        self.__fernet = None
+
+        if path:
+            if not key:
+                logging.warning("MEROSHARE_TOKEN_KEY not set, tokens kept in memory")
+                self.path = None
+            else:
+                try:
+                    from cryptography.fernet import Fernet
+                except ImportError:
+                    logging.warning(
+                        "Install 'cryptography' to save login tokens to disk"
+                    )
+                    self.path = None
+                else:
+                    self.__fernet = Fernet(key)
+                    self.__load()
+
+    def __load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "rb") as token_file_:
+                tokens = json.loads(self.__fernet.decrypt(token_file_.read()))
+            self.__tokens = {tuple(item[0]): tuple(item[1]) for item in tokens}
+        except Exception as error:
+            logging.info(f"Token cache unavailable: {error}")
+
+    def __save(self):
+        if not self.path:
+            return
+        try:
+            data = json.dumps([[list(k), list(v)] for k, v in self.__tokens.items()])
+            with open(self.path, "wb") as token_file_:
+                token_file_.write(self.__fernet.encrypt(data.encode()))
+        except OSError as error:
+            logging.info(f"Couldn't save token cache: {error}")
+
+    def get(self, capital_id, username):
+        key = (str(capital_id), str(username))
+        with self.__lock:
+            token = self.__tokens.get(key)
+            if token and token[1] - self.margin > time.time():
+                return token[0], token[2]
+            if token:
+                del self.__tokens[key]
+        return None
+
+    def put(self, capital_id, username, token, status=None):
+        key = (str(capital_id), str(username))
+        with self.__lock:
+            self.__tokens[key] = (token, token_expiry(token), status)
+            self.__save()
+
+    def discard(self, capital_id, username):
+        key = (str(capital_id), str(username))
+        with self.__lock:
+            if self.__tokens.pop(key, None):
+                self.__save()
+
+    def clear(self):
+        with self.__lock:
+            self.__tokens = {}
+            self.__save()
@@ -0,0 +1,95 @@
+import json
+import logging
+import os
+import threading
+
+bank_cache_file = os.environ.get("MEROSHARE_BANK_CACHE")
+
+
+def normalize(name):
+    return " ".join(str(name or "").replace(".", " ").split()).upper()
+
+
+class BankCache:
+    # The bank list is public and saved as it is. Account numbers and
+    # customer ids are only saved encrypted with `key` (the same Fernet key
+    # as the token cache); without one they are kept in memory.
+    def __init__(self, path: str = None, key: str = None):
+        self.path = path
+        self.__lock = threading.Lock()
+        self.__banks = None
+        self.__refreshed = False
+        self.__details = {}
+        self.__fernet = None
+
+        if path and key:
+            try:
+                from cryptography.fernet import Fernet
+            except ImportError:
+                logging.warning(
+                    "Install 'cryptography' to save bank account details to disk"
+                )
+            else:
+                self.__fernet = Fernet(key)
+        elif path:
+            logging.info("MEROSHARE_TOKEN_KEY not set, bank details kept in memory")
+        self.__load()
+
+    def __load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path) as bank_file_:
+                cache = json.load(bank_file_)
+            self.__banks = cache.get("banks")
+            details = cache.get("details")
+            if self.__fernet is not None and isinstance(details, str):
+                self.__details = json.loads(self.__fernet.decrypt(details.encode()))
+        except Exception as error:
+            logging.info(f"Bank cache unavailable: {error}")
+
+    def __save(self):
+        if not self.path:
+            return
+        cache = {"banks": self.__banks}
+        if self.__fernet is not None:
+            data = json.dumps(self.__details).encode()
+            cache["details"] = self.__fernet.encrypt(data).decode()
+        try:
+            with open(self.path, "w") as bank_file_:
+                json.dump(cache, bank_file_)
+        except OSError as error:
+            logging.info(f"Couldn't save bank cache: {error}")
+
+    def get_bank_id(self, name, fetch):
+        key = normalize(name)
+        with self.__lock:
+            if self.__banks is None or (
+                key not in self.__banks and not self.__refreshed
+            ):
+                self.__refreshed = True
+                self.__banks = {
+                    normalize(bank_["name"]): bank_["id"] for bank_ in fetch()
+                }
+                self.__save()
+            return self.__banks.get(key)
+
+    def get_detail(self, dmat, bank_id, fetch):
+        key = f"{dmat}:{bank_id}"
+        with self.__lock:
+            if key in self.__details:
+                return self.__details[key]
+
+        # Fetched outside the lock: every account has its own detail, so
+        # there is nothing to de-duplicate and workers shouldn't queue up.
+        detail = fetch()
+        with self.__lock:
+            self.__details[key] = detail
+            self.__save()
+        return detail
+
+    def clear(self):
+        with self.__lock:
+            self.__banks = None
+            self.__refreshed = False
+            self.__details = {}
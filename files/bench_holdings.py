@@ -0,0 +1,140 @@
+import argparse
+import json
+import random
+import sys
+import time
+
+try:
+    import holdings
+except ImportError:
+    from files import holdings
+
+# Consolidating share lists: the object-dtype frame the share list used to
+# be, pivoted the obvious way, against holdings.share_frame() and
+# holdings.consolidate(), on a made-up set of accounts and scrips.
+
+
+def make_rows(accounts, scrips, density, seed=1):
+    rng = random.Random(seed)
+    rows = []
+    for account in range(accounts):
+        demat = f"1301090{account:07d}"
+        for scrip in range(scrips):
+            if rng.random() >= density:
+                continue
+            current = rng.randint(10, 5000)
+            free = current - (rng.randint(1, current) if rng.random() < 0.05 else 0)
+            # The server sends numbers, and sometimes numbers as text.
+            rows.append(
+                (
+                    str(account + 1),
+                    f"Client {account + 1}",
+                    demat,
+                    f"S{scrip:03d}",
+                    str(current) if rng.random() < 0.5 else float(current),
+                    free,
+                )
+            )
+    return rows
+
+
+def baseline_frame(rows):
+    import pandas as pd
+
+    frame = pd.DataFrame.from_records(rows, columns=holdings.share_columns)
+    for column in holdings.balance_columns:
+        frame[column] = pd.to_numeric(frame[column])
+    return frame
+
+
+def baseline(frame):
+    by_scrip = frame.groupby("Script")[holdings.balance_columns].sum()
+    by_account = frame.groupby(["Client ID", "Name", "DMAT No"])[
+        holdings.balance_columns
+    ].sum()
+    pivot = frame.pivot_table(
+        index="Script",
+        columns="DMAT No",
+        values="Current Balance",
+        aggfunc="sum",
+        fill_value=0,
+    )
+    return {"by_scrip": by_scrip, "by_account": by_account, "pivot": pivot}
+
+
+def measure(name, build, analyse, rows, repeat):
+    # Building the frame happens once per run; the analysis is what gets
+    # repeated for every pivot asked of it.
+    builds, analyses = [], []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        frame = build(rows)
+        built = time.perf_counter()
+        tables = analyse(frame)
+        builds.append(built - start)
+        analyses.append(time.perf_counter() - built)
+    return {
+        "method": name,
+        "rows": len(frame),
+        "build_seconds": min(builds),
+        "analyse_seconds": min(analyses),
+        "frame_mb": frame.memory_usage(deep=True).sum() / 1024 / 1024,
+        "scrip_total": float(tables["by_scrip"]["Current Balance"].sum()),
+        "pivot_shape": list(tables["pivot"].shape),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Measure consolidating share lists on made-up data."
+    )
+    parser.add_argument("--accounts", type=int, default=1000)
+    parser.add_argument("--scrips", type=int, default=100)
+    parser.add_argument(
+        "--density",
+        type=float,
+        default=0.3,
+        help="share of scrips each account holds",
+    )
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args(argv)
+
+    import pandas  # imported before timing starts
+
+    rows = make_rows(args.accounts, args.scrips, args.density)
+    results = [
+        measure("object", baseline_frame, baseline, rows, args.repeat),
+        measure(
+            "consolidated",
+            holdings.share_frame,
+            holdings.consolidate,
+            rows,
+            args.repeat,
+        ),
+    ]
+    if results[0]["scrip_total"] != results[1]["scrip_total"]:
+        raise RuntimeError("Totals differ between the two methods")
+
+    header = (
+        f"{'method':<13} {'rows':>8} {'build s':>8} {'analyse s':>9} "
+        f"{'frame MB':>9} {'pivot':>10}"
+    )
+    print(header)
+    print("-" * len(header))
+    for result in results:
+        print(
+            f"{result['method']:<13} {result['rows']:>8} "
+            f"{result['build_seconds']:>8.3f} {result['analyse_seconds']:>9.3f} "
+            f"{result['frame_mb']:>9.1f} "
+            f"{'x'.join(str(size) for size in result['pivot_shape']):>10}"
+        )
+
+    if args.json:
+        with open(args.json, "w") as json_file:
+            json.dump(results, json_file, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,103 @@
+import argparse
+import os
+import subprocess
+import sys
+
+# Modules that must not be loaded just by starting the tool; each is imported
+# by the code path that needs it.
+heavy_modules = ("pandas", "openpyxl", "requests", "urllib3", "tenacity", "pyarrow")
+
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def import_times(code):
+    # `python -X importtime` writes one line per imported module to stderr:
+    #   import time: self [us] | cumulative | imported package
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=root,
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:") :].split("|")
+        if not self_us.strip().isdigit():
+            continue
+        name = name.rstrip()
+        depth = (len(name) - len(name.lstrip())) // 2
+        times[name.strip()] = (int(self_us), int(cumulative_us), depth)
+    return times
+
+
+def report(module, runs=3, top=15):
+    # Best of several runs, since the first one also pays for cold disk caches.
+    # Modules the interpreter loads before running any code are left out.
+    interpreter = import_times("pass")
+    best = {}
+    for _ in range(runs):
+        for name, (self_us, cumulative_us, depth) in import_times(
+            f"import {module}"
+        ).items():
+            if name in interpreter:
+                continue
+            if name not in best or cumulative_us < best[name][1]:
+                best[name] = (self_us, cumulative_us, depth)
+
+    total = best[module][1] / 1000
+    print(f"import {module}: {total:.1f} ms")
+    print(f"{'module':<40} {'self ms':>9} {'total ms':>9}")
+
+    ranked = sorted(best.items(), key=lambda item: item[1][1], reverse=True)
+    shown = [
+        (name, times)
+        for name, times in ranked
+        if name.startswith("files") or times[2] <= 2
+    ]
+    for name, (self_us, cumulative_us, depth) in shown[:top]:
+        print(f"{name:<40} {self_us / 1000:>9.1f} {cumulative_us / 1000:>9.1f}")
+
+    loaded = [name for name in heavy_modules if name in best]
+    return total, loaded
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Report the import cost of the tool's entry points."
+    )
+    parser.add_argument(
+        "modules", nargs="*", default=["files.cli", "files.xl"], help="modules to time"
+    )
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument(
+        "--top", type=int, default=15, help="modules listed per entry point"
+    )
+    parser.add_argument(
+        "--max-ms",
+        type=float,
+        default=float(os.environ.get("MEROSHARE_STARTUP_MAX_MS", 0)),
+        help="fail when an entry point takes longer than this to import",
+    )
+    args = parser.parse_args(argv)
+
+    failed = False
+    for module in args.modules:
+        total, loaded = report(module, args.runs, args.top)
+        if loaded:
+            print(f"FAIL: {module} imports {', '.join(loaded)} at startup")
+            failed = True
+        if args.max_ms and total > args.max_ms:
+            print(f"FAIL: {module} took {total:.1f} ms, over {args.max_ms:.0f} ms")
+            failed = True
+        print()
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,272 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+# End-to-end throughput of every xl.py operation against the local mock
+# server (files/mock_server.py). Each case runs in a fresh process so caches
+# and peak memory of one case don't leak into the next.
+
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+operations_ = ["status", "shares", "issues", "apply", "app-status"]
+sizes_ = [10, 100, 1000]
+
+options_ = {
+    "apply": {"Scrip": "ABC", "qty": 10},
+    "app-status": {"Scrip": ["ABC", "XYZ"]},
+}
+
+
+def make_accounts(count):
+    try:
+        from credentials import Account
+    except ImportError:
+        from files.credentials import Account
+
+    return [
+        Account(
+            number + 2,
+            (
+                number + 1,
+                f"Client {number + 1}",
+                "YES",
+                "YES",
+                f"{10000000 + number}",
+                13010900,
+                "secret",
+                f"CRN{number}",
+                1234,
+                "GLOBAL IME BANK LTD",
+            ),
+        )
+        for number in range(count)
+    ]
+
+
+def peak_memory_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS.
+    return peak / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+
+def run_case(operation, size, workers, output):
+    try:
+        import metrics
+        import xl
+        import throttle
+    except ImportError:
+        from files import metrics, xl, throttle
+
+    latencies, failures = [], []
+
+    def observe(method, url, status, seconds, size, account):
+        latencies.append(seconds)
+        if status is None or status >= 400:
+            failures.append(status)
+
+    throttle.observers_.append(observe)
+    accounts = make_accounts(size)
+
+    start = time.perf_counter()
+    collector = xl.run_report(
+        operation,
+        accounts,
+        "csv",
+        name=os.path.join(output, f"{operation}-{size}"),
+        workers=workers,
+        **options_.get(operation, {}),
+    )
+    seconds = time.perf_counter() - start
+
+    p50 = metrics.percentile(latencies, 0.5) if latencies else None
+    p99 = metrics.percentile(latencies, 0.99) if latencies else None
+    return {
+        "operation": operation,
+        "accounts": size,
+        "workers": workers,
+        "seconds": seconds,
+        "accounts_per_second": size / seconds if seconds else None,
+        "client_requests": len(latencies),
+        "failed_requests": len(failures),
+        "p50_ms": None if p50 is None else p50 * 1000,
+        "p99_ms": None if p99 is None else p99 * 1000,
+        "peak_mb": peak_memory_mb(),
+        "rows": len(collector),
+    }
+
+
+def start_server(args):
+    command = [
+        sys.executable,
+        "-m",
+        "files.mock_server",
+        "--port",
+        "0",
+        "--latency",
+        str(args.latency),
+        "--jitter",
+        str(args.jitter),
+        "--error-rate",
+        str(args.error_rate),
+        "--throttle-rate",
+        str(args.throttle_rate),
+        "--stall-rate",
+        str(args.stall_rate),
+        "--stall",
+        str(args.stall),
+        "--shares",
+        str(args.shares),
+        "--seed",
+        "1",
+    ]
+    server = subprocess.Popen(command, cwd=root, stdout=subprocess.PIPE, text=True)
+    return server, server.stdout.readline().strip()
+
+
+def server_call(base_url, path):
+    request = urllib.request.Request(f"{base_url}{path}", method="POST", data=b"")
+    with urllib.request.urlopen(request) as response:
+        return json.load(response)
+
+
+def case_env(args, base_url, workdir, operation, size):
+    env = {
+        key: value
+        for key, value in os.environ.items()
+        if key
+        not in (
+            "MEROSHARE_TOKEN_FILE",
+            "MEROSHARE_BANK_CACHE",
+        )
+    }
+    env.update(
+        MEROSHARE_BASE_URL=base_url,
+        MEROSHARE_CAPITALS_FILE=os.path.join(workdir, "capitals.json"),
+        MEROSHARE_JOURNAL=os.path.join(workdir, f"journal-{operation}-{size}.sqlite3"),
+        # The mock accounts' share lists stay out of the real snapshots.
+        MEROSHARE_SNAPSHOTS=os.path.join(
+            workdir, f"snapshots-{operation}-{size}.sqlite3"
+        ),
+    )
+    if not args.keep_limits:
+        # The client-side limits exist to protect the live server; against the
+        # mock they would only measure themselves.
+        for name in ("RATE", "RATE_AUTH", "RATE_APPLY", "RATE_SEARCH", "RATE_OTHER"):
+            env[f"MEROSHARE_{name}"] = "0"
+    return env
+
+
+def print_header():
+    header = (
+        f"{'operation':<11} {'accounts':>8} {'seconds':>8} {'acc/s':>8} "
+        f"{'req/acc':>8} {'p50 ms':>8} {'p99 ms':>8} {'peak MB':>8} {'failed':>7}"
+    )
+    print(header)
+    print("-" * len(header))
+
+
+def print_result(result):
+    print(
+        f"{result['operation']:<11} {result['accounts']:>8} "
+        f"{result['seconds']:>8.2f} {result['accounts_per_second']:>8.1f} "
+        f"{result['requests_per_account']:>8.2f} "
+        f"{result['p50_ms'] or 0:>8.1f} {result['p99_ms'] or 0:>8.1f} "
+        f"{result['peak_mb'] or 0:>8.1f} {result['failed_requests']:>7}",
+        flush=True,
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Measure every operation end to end against the mock server."
+    )
+    parser.add_argument("--operations", nargs="+", default=operations_)
+    parser.add_argument("--sizes", nargs="+", type=int, default=sizes_)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--latency", type=float, default=0.005)
+    parser.add_argument("--jitter", type=float, default=0.005)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--throttle-rate", type=float, default=0.0)
+    parser.add_argument("--stall-rate", type=float, default=0.0)
+    parser.add_argument("--stall", type=float, default=2.0)
+    parser.add_argument("--shares", type=int, default=25)
+    parser.add_argument(
+        "--keep-limits",
+        action="store_true",
+        help="keep the client-side rate limits (MEROSHARE_RATE*)",
+    )
+    parser.add_argument("--json", help="also write the results to this file")
+    parser.add_argument("--case", nargs=2, metavar=("OPERATION", "SIZE"))
+    parser.add_argument("--output", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.case:
+        operation, size = args.case[0], int(args.case[1])
+        print(json.dumps(run_case(operation, size, args.workers, args.output)))
+        return 0
+
+    unknown = set(args.operations) - set(operations_)
+    if unknown:
+        parser.error(f"unknown operations: {', '.join(sorted(unknown))}")
+
+    server, base_url = start_server(args)
+    results = []
+    print_header()
+    try:
+        with tempfile.TemporaryDirectory() as workdir:
+            for operation in args.operations:
+                for size in args.sizes:
+                    server_call(base_url, "/__reset")
+                    command = [
+                        sys.executable,
+                        "-m",
+                        "files.bench_throughput",
+                        "--case",
+                        operation,
+                        str(size),
+                        "--output",
+                        workdir,
+                    ]
+                    if args.workers:
+                        command += ["--workers", str(args.workers)]
+                    case = subprocess.run(
+                        command,
+                        cwd=root,
+                        env=case_env(args, base_url, workdir, operation, size),
+                        capture_output=True,
+                        text=True,
+                    )
+                    if case.returncode:
+                        print(case.stderr, file=sys.stderr)
+                        raise RuntimeError(f"{operation} with {size} accounts failed")
+
+                    result = json.loads(case.stdout.strip().splitlines()[-1])
+                    stats = server_call(base_url, "/__stats")
+                    result["server_requests"] = stats["requests"]
+                    result["requests_per_account"] = stats["requests"] / size
+                    results.append(result)
+                    print_result(result)
+    finally:
+        server.terminate()
+        server.wait()
+
+    if args.json:
+        with open(args.json, "w") as json_file:
+            json.dump(results, json_file, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,66 @@
+import json
+import logging
+import os
+import threading
+import time
+
+ttl_ = float(os.environ.get("MEROSHARE_CAPITAL_TTL", 7 * 24 * 60 * 60))
+
+
+class CapitalRegistry:
+    def __init__(self, path, fetch, ttl: float = ttl_):
+        self.path = path
+        self.ttl = ttl
+        self.__fetch = fetch
+        self.__lock = threading.Lock()
+        self.__index = None
+        self.__refreshed = False
+
+    def __build(self, capitals):
+        return {str(capital["code"]): capital["id"] for capital in capitals}
+
+    def __read(self):
+        try:
+            with open(self.path) as cap_file_:
+                index = self.__build(json.load(cap_file_))
+            stale = time.time() - os.path.getmtime(self.path) > self.ttl
+        except (OSError, ValueError, KeyError, TypeError) as error:
+            logging.info(f"Capitals List Cache unavailable: {error}")
+            return None, True
+
+        if stale:
+            logging.info("Capitals List Cache is stale")
+        return index, stale
+
+    def __refresh(self):
+        # Only ever refresh once per process, so a batch full of unknown DPs
+        # doesn't download the list again for every row.
+        self.__refreshed = True
+        logging.info("Updating Capitals List Cache")
+        try:
+            capitals = self.__fetch()
+            with open(self.path, "w") as cap_file_:
+                json.dump(capitals, cap_file_)
+            self.__index = self.__build(capitals)
+        except Exception as error:
+            logging.error(f"Error updating Capitals List: {error}")
+            if self.__index is None:
+                self.__index = {}
+
+    def get(self, code):
+        code = str(code)
+        with self.__lock:
+            if self.__index is None:
+                self.__index, stale = self.__read()
+                if stale:
+                    self.__refresh()
+
+            if code not in self.__index and not self.__refreshed:
+                self.__refresh()
+
+            return self.__index.get(code)
+
+    def clear(self):
+        with self.__lock:
+            self.__index = None
+            self.__refreshed = False
@@ -0,0 +1,384 @@
+import argparse
+import datetime
+import logging
+import os
+import sys
+
+try:
+    import xl
+    import engine
+    import session_pool
+    import hedging
+    import sinks
+    import throttle
+    import sharding
+    from credentials import load_accounts, login_file
+except ImportError:
+    from files import xl, engine, session_pool, hedging, sinks, throttle, sharding
+    from files.credentials import load_accounts, login_file
+
+# Several operations can run in one invocation, separated by a lone "+":
+#   python -m files.cli --workers 16 status + apply --scrip ABC --qty 10
+separator = "+"
+
+global_options = (
+    "workers",
+    "rate",
+    "format",
+    "resume",
+    "login_file",
+    "accounts",
+    "metrics",
+    "shard",
+    "shard_by",
+    "processes",
+)
+
+
+def open_time(value):
+    try:
+        xl.parse_open_time(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError("expected HH:MM[:SS] or YYYY-MM-DD HH:MM[:SS]")
+    return value
+
+
+def snapshot_date(value):
+    try:
+        return datetime.date.fromisoformat(value).isoformat()
+    except ValueError:
+        raise argparse.ArgumentTypeError("expected YYYY-MM-DD")
+
+
+def shard_value(value):
+    try:
+        return sharding.parse_shard(value)
+    except ValueError as error:
+        raise argparse.ArgumentTypeError(f"expected K/N, e.g. 1/4 ({error})")
+
+
+def worker_count(value):
+    try:
+        workers = int(value)
+    except ValueError:
+        workers = 0
+    if workers < 1:
+        raise argparse.ArgumentTypeError("expected a whole number of at least 1")
+    return workers
+
+
+def add_options(parser, defaults=True):
+    # Sub-commands accept the same options with suppressed defaults, so they
+    # can be given before or after the operation name.
+    def default(value):
+        return value if defaults else argparse.SUPPRESS
+
+    parser.add_argument(
+        "--workers",
+        type=worker_count,
+        default=default(engine.workers_),
+        help="clients processed at the same time",
+    )
+    parser.add_argument(
+        "--rate",
+        type=float,
+        default=default(throttle.rate_),
+        help="maximum requests per second to the server (0 for no limit)",
+    )
+    parser.add_argument(
+        "--format",
+        choices=sorted(sinks.sinks_),
+        default=default(os.environ.get("MEROSHARE_OUTPUT", "xlsx")),
+        help="output file format; csv, jsonl and parquet are written as rows "
+        "arrive (every MEROSHARE_FLUSH_EVERY rows), xlsx only at the end, so a "
+        "crash loses the whole xlsx file",
+    )
+    parser.add_argument(
+        "--output",
+        default=default(None),
+        help="output file name without extension (default as in the menu)",
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        default=default(False),
+        help="skip clients already completed in an earlier, interrupted run",
+    )
+    parser.add_argument(
+        "--metrics",
+        default=default(None),
+        help="also write the run metrics here: JSON for a .json name, "
+        "OpenMetrics text otherwise ({operation} is replaced by the operation)",
+    )
+    parser.add_argument(
+        "--shard",
+        type=shard_value,
+        default=default(None),
+        metavar="K/N",
+        help="only run shard K of N and write a partial output for 'merge'",
+    )
+    parser.add_argument(
+        "--shard-by",
+        choices=["hash", "range"],
+        default=default("hash"),
+        help="split clients by a hash of the demat or by blocks of rows",
+    )
+    parser.add_argument(
+        "--processes",
+        type=int,
+        default=default(1),
+        help="run this many shards side by side and merge their outputs",
+    )
+    parser.add_argument(
+        "--login-file",
+        default=default(login_file),
+        help="workbook with the login details",
+    )
+    parser.add_argument(
+        "--accounts",
+        default=default(None),
+        help="only these clients: comma separated S.No, Client ID, Demat or Name",
+    )
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="python -m files.cli",
+        description="Run MeroShare batch operations for the clients in the login workbook.",
+        epilog=f"Separate several operations with '{separator}' to run them one after another.",
+    )
+    add_options(parser)
+
+    common = argparse.ArgumentParser(add_help=False)
+    add_options(common, defaults=False)
+
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser(
+        "status", parents=[common], help="check that every client can log in"
+    )
+    shares = commands.add_parser(
+        "shares", parents=[common], help="list the shares held by every client"
+    )
+    shares.add_argument(
+        "--changes",
+        action="store_true",
+        help="only output what changed since the last stored share list",
+    )
+    shares.add_argument(
+        "--consolidate",
+        action="store_true",
+        help="also write per-scrip and per-client totals and a scrip x client table",
+    )
+
+    shares_diff = commands.add_parser(
+        "shares-diff",
+        parents=[common],
+        help="compare two stored share lists without asking the server",
+    )
+    shares_diff.add_argument(
+        "--since",
+        type=snapshot_date,
+        help="date of the earlier list (default the one before --until)",
+    )
+    shares_diff.add_argument(
+        "--until", type=snapshot_date, help="date of the later list (default today)"
+    )
+    commands.add_parser(
+        "issues", parents=[common], help="list the issues every client can apply for"
+    )
+
+    apply = commands.add_parser("apply", parents=[common], help="apply for an IPO")
+    apply.add_argument("--scrip", required=True)
+    apply.add_argument("--qty", required=True, type=int)
+    apply.add_argument(
+        "--open-at",
+        type=open_time,
+        help="log in and prepare everything ahead, then apply exactly at this "
+        "time (HH:MM[:SS] today, or YYYY-MM-DD HH:MM:SS)",
+    )
+    apply.add_argument(
+        "--apply-workers",
+        type=worker_count,
+        default=None,
+        help="applications sent at the same time (default "
+        f"{engine.apply_workers_}, or --workers with --open-at); logins and "
+        "lookups use --workers",
+    )
+
+    app_status = commands.add_parser(
+        "app-status",
+        parents=[common],
+        help="check the application status of one or more scrips",
+    )
+    app_status.add_argument("--scrip", required=True, nargs="+")
+
+    merge = commands.add_parser(
+        "merge",
+        parents=[common],
+        help="combine the partial outputs of all shards in list order",
+    )
+    merge.add_argument("parts", nargs="+", help="the .shard-K-of-N.jsonl files")
+
+    return parser
+
+
+def split_commands(argv):
+    chunks = [[]]
+    for arg in argv:
+        if arg == separator:
+            chunks.append([])
+        else:
+            chunks[-1].append(arg)
+    return [chunk for chunk in chunks if chunk]
+
+
+def parse_commands(argv, parser=None):
+    # Options given before the first operation carry over to the later ones,
+    # unless an operation sets them again.
+    parser = parser or build_parser()
+    chunks = split_commands(argv) or [[]]
+    commands = [parser.parse_args(chunks[0])]
+    defaults = {option: getattr(commands[0], option) for option in global_options}
+    for chunk in chunks[1:]:
+        commands.append(parser.parse_args(chunk, argparse.Namespace(**defaults)))
+    return commands
+
+
+def select_accounts(accounts, wanted):
+    if not wanted:
+        return accounts
+
+    wanted = {value.strip().upper() for value in wanted.split(",") if value.strip()}
+    return [
+        account
+        for account in accounts
+        if {
+            str(account.serial).upper(),
+            account.username.upper(),
+            account.demat.upper(),
+            str(account.name).upper(),
+        }
+        & wanted
+    ]
+
+
+def operation(args):
+    if args.command == "apply" and args.open_at:
+        return "apply-at-open"
+    if args.command == "shares" and args.changes:
+        return "shares-changes"
+    return args.command
+
+
+def operation_options(args):
+    options = {"workers": args.workers, "resume": args.resume}
+    if args.command == "apply":
+        options.update(Scrip=args.scrip, qty=args.qty, apply_workers=args.apply_workers)
+        if args.open_at:
+            options.update(open_at=args.open_at)
+    elif args.command == "app-status":
+        options.update(Scrip=args.scrip)
+    elif args.command == "shares-diff":
+        options.update(since=args.since, until=args.until)
+    return options
+
+
+def consolidates(args):
+    return operation(args) == "shares" and args.consolidate
+
+
+def report_name(args):
+    return args.output or xl.report_name(operation(args), **operation_options(args))
+
+
+def shard_path(path, shard, shards):
+    root, extension = os.path.splitext(path)
+    return sharding.part_name(root, shard, shards) + extension
+
+
+def merge(args, parts, name=None):
+    accounts, _ = load_accounts(args.login_file)
+    try:
+        count = sharding.merge(parts, accounts, name, args.format)
+    except (OSError, ValueError) as error:
+        sys.exit(f"merge: {error}")
+    logging.info(f"merge: {count} rows written")
+    return count
+
+
+def run(args):
+    if args.command == "merge":
+        return merge(args, args.parts, args.output)
+
+    throttle.host_limiter.set_rate(args.rate)
+    accounts, _ = load_accounts(args.login_file)
+    accounts = select_accounts(accounts, args.accounts)
+
+    name, output_format, metrics_file = args.output, args.format, args.metrics
+    if args.shard:
+        shard, shards = args.shard
+        accounts = sharding.select(accounts, shard, shards, args.shard_by)
+        name = sharding.part_name(report_name(args), shard, shards)
+        output_format = sharding.part_format
+        if metrics_file:
+            metrics_file = shard_path(metrics_file, shard, shards)
+        logging.info(f"Shard {shard} of {shards}: {len(accounts)} clients")
+
+    if not accounts:
+        logging.warning("No clients selected")
+
+    # Sharded runs consolidate once all the shards are merged.
+    collector = xl.run_report(
+        operation(args),
+        accounts,
+        output_format,
+        name=name,
+        metrics_file=metrics_file,
+        consolidate=consolidates(args) and not args.shard,
+        **operation_options(args),
+    )
+    logging.info(f"{args.command}: {len(collector)} rows written")
+    return collector
+
+
+def run_sharded(argv, commands):
+    # Each shard runs the whole command line in its own process; their
+    # partial outputs are merged here once all of them are done.
+    processes = commands[0].processes
+    codes = sharding.run_local(argv, processes)
+    if any(codes):
+        failed = [str(shard) for shard, code in enumerate(codes, 1) if code]
+        logging.error(f"Shards {', '.join(failed)} failed, outputs not merged")
+        return 1
+
+    for args in commands:
+        if args.command == "merge":
+            continue
+        name = report_name(args)
+        parts = sharding.part_paths(name, processes)
+        merge(args, parts, name)
+        for part in parts:
+            os.remove(part)
+        if consolidates(args):
+            accounts, _ = load_accounts(args.login_file)
+            accounts = select_accounts(accounts, args.accounts)
+            xl.consolidate_shares(accounts, name, args.format)
+    return 0
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    commands = parse_commands(argv)
+    xl.configure_logging()
+    if commands[0].processes > 1 and not commands[0].shard:
+        return run_sharded(argv, commands)
+
+    for args in commands:
+        run(args)
+    session_pool.log_stats(logging)
+    hedging.log_stats(logging)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
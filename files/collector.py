@@ -0,0 +1,46 @@
+import threading
+
+
+class ResultCollector:
+    def __init__(self, columns, rows=(), keep: bool = True):
+        self.columns = list(columns)
+        self.keep = keep
+        self.count = 0
+        self.__rows = []
+        self.__listeners = []
+        self.__lock = threading.Lock()
+        self.extend(rows)
+
+    def subscribe(self, listener):
+        # Listeners get every row as it arrives, so results can be streamed
+        # out without waiting for (or keeping) the whole batch.
+        self.__listeners.append(listener)
+        return listener
+
+    def append(self, row):
+        row = tuple(row)
+        if len(row) != len(self.columns):
+            raise ValueError(f"Expected {len(self.columns)} values, got {len(row)}")
+
+        with self.__lock:
+            self.count += 1
+            if self.keep:
+                self.__rows.append(row)
+            for listener in self.__listeners:
+                listener(row)
+
+    def extend(self, rows):
+        for row in rows:
+            self.append(row)
+
+    def rows(self):
+        with self.__lock:
+            return list(self.__rows)
+
+    def __len__(self):
+        return self.count
+
+    def to_frame(self):
+        import pandas as pd
+
+        return pd.DataFrame.from_records(self.rows(), columns=self.columns)
@@ -0,0 +1,107 @@
+import logging
+import os
+import threading
+
+login_file = "MeroShare Login Details.xlsx"
+column_count = 10
+
+
+class Account:
+    __slots__ = (
+        "row",
+        "serial",
+        "name",
+        "active",
+        "apply",
+        "username",
+        "dp_code",
+        "password",
+        "crn",
+        "pin",
+        "bank",
+    )
+
+    def __init__(self, row, details):
+        self.row = row
+        self.serial = details[0]
+        self.name = details[1]
+        self.active = str(details[2]).upper() != "NO"
+        self.apply = str(details[3]).upper() != "NO"
+        self.username = str(details[4]).replace(" ", "")
+        self.dp_code = str(int(details[5]))
+        self.password = details[6]
+        self.crn = details[7]
+        self.pin = details[8]
+        self.bank = details[9]
+
+    @property
+    def dpid(self):
+        return int(self.dp_code) - 13000000
+
+    @property
+    def demat(self):
+        return self.dp_code + self.username
+
+    def client_id(self, client_type=""):
+        return client_type + str(self.serial)
+
+    def login_info(self, client_type=""):
+        return {
+            "name": self.name,
+            "username": self.username,
+            "password": self.password,
+            "dpid": self.dpid,
+            "client_id": self.client_id(client_type),
+            "crn": self.crn,
+            "pin": self.pin,
+            "bank": self.bank,
+        }
+
+
+def parse_rows(rows, first_row=2):
+    accounts, errors = [], []
+    for row, details in enumerate(rows, first_row):
+        details = tuple(details) + (None,) * (column_count - len(details))
+        if not any(value is not None for value in details):
+            continue
+
+        if details[4] is None or details[5] is None or details[6] is None:
+            errors.append((row, "Client ID, DP ID and Password are required"))
+            continue
+
+        try:
+            accounts.append(Account(row, details))
+        except (TypeError, ValueError) as error:
+            errors.append((row, f"Invalid DP ID: {details[5]} ({error})"))
+
+    return accounts, errors
+
+
+cache_lock = threading.Lock()
+cache_ = {}
+
+
+def load_accounts(path=login_file, sheet="List"):
+    # Parsed accounts are reused until the workbook changes. They hold every
+    # password, PIN and CRN, so they are only kept in memory.
+    key = (os.path.abspath(path), sheet, os.path.getmtime(path))
+    with cache_lock:
+        if key in cache_:
+            return cache_[key]
+
+        from openpyxl import load_workbook
+
+        book = load_workbook(filename=path, read_only=True, data_only=True)
+        try:
+            loaded = parse_rows(
+                book[sheet].iter_rows(min_row=2, min_col=1, values_only=True)
+            )
+        finally:
+            book.close()
+
+        for row, error in loaded[1]:
+            logging.warning(f"Skipping row {row} of {path}: {error}")
+
+        cache_.clear()
+        cache_[key] = loaded
+        return loaded
@@ -0,0 +1,543 @@
+import argparse
+import hmac
+import json
+import logging
+import os
+import signal
+import socketserver
+import sys
+import threading
+import time
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+try:
+    from meroshare import MeroShare, configure_logging, issues_
+    import engine
+    import metrics
+    import throttle
+    import xl
+    from cli import select_accounts
+    from credentials import load_accounts, login_file
+    from journal import journal_, apply_key
+    from snapshots import snapshots_
+except ImportError:
+    from files.meroshare import MeroShare, configure_logging, issues_
+    from files import engine, metrics, throttle, xl
+    from files.cli import select_accounts
+    from files.credentials import load_accounts, login_file
+    from files.journal import journal_, apply_key
+    from files.snapshots import snapshots_
+
+# A resident process that keeps every account's session, login and the
+# capital and bank caches warm, and answers queries over a local HTTP API
+# (or a Unix socket) instead of starting a batch for each one.
+host_ = os.environ.get("MEROSHARE_DAEMON_HOST", "127.0.0.1")
+port_ = int(os.environ.get("MEROSHARE_DAEMON_PORT", 8765))
+# When set, every request needs "Authorization: Bearer <token>". Without it
+# POST /apply is refused.
+token_ = os.environ.get("MEROSHARE_DAEMON_TOKEN")
+loopback_ = ("127.0.0.1", "localhost", "::1")
+# How long a successful answer is served again without asking the server.
+ttl_ = float(os.environ.get("MEROSHARE_DAEMON_TTL", 30))
+# Seconds between keep-alive requests for logged-in accounts; 0 is off.
+keep_alive_ = float(os.environ.get("MEROSHARE_DAEMON_KEEP_ALIVE", 0))
+
+
+class Coalescer:
+    # Identical requests that arrive while one is in flight wait for its
+    # answer instead of sending their own; successful answers are also kept
+    # for `ttl` seconds.
+    def __init__(self, ttl: float = 0):
+        self.ttl = ttl
+        self.__lock = threading.Lock()
+        self.__pending = {}
+        self.__results = {}
+        self.hits = 0
+        self.shared = 0
+
+    def get(self, key, work, ttl=None, fresh=False):
+        ttl = self.ttl if ttl is None else ttl
+        with self.__lock:
+            cached = self.__results.get(key)
+            if cached and not fresh and time.monotonic() - cached[0] < ttl:
+                self.hits += 1
+                return cached[1]
+            future = self.__pending.get(key)
+            owner = future is None
+            if owner:
+                future = self.__pending[key] = Future()
+            else:
+                self.shared += 1
+
+        if not owner:
+            return future.result()
+
+        try:
+            result = work()
+        except BaseException as error:
+            future.set_exception(error)
+            raise
+        else:
+            future.set_result(result)
+        finally:
+            with self.__lock:
+                del self.__pending[key]
+
+        rows, status, done = result
+        with self.__lock:
+            if done and ttl > 0:
+                self.__results[key] = (time.monotonic(), result)
+            else:
+                self.__results.pop(key, None)
+        return result
+
+    def forget(self, *prefix):
+        with self.__lock:
+            for key in [key for key in self.__results if key[: len(prefix)] == prefix]:
+                del self.__results[key]
+
+
+class Sessions:
+    # One MeroShare per account, reused by every request. Requests for the
+    # same account take turns, since a MeroShare keeps per-request state.
+    def __init__(self):
+        self.__lock = threading.Lock()
+        self.__sessions = {}
+        self.__ready = set()
+
+    def get(self, account, client_type=""):
+        info = account.login_info(client_type)
+        with self.__lock:
+            entry = self.__sessions.get(account.demat)
+            # A changed password or bank in the workbook starts a new session.
+            if entry is None or entry[0] != info:
+                entry = self.__sessions[account.demat] = (
+                    info,
+                    MeroShare(**info),
+                    threading.Lock(),
+                )
+                self.__ready.discard(account.demat)
+            return entry[1], entry[2]
+
+    def mark(self, account, ready):
+        with self.__lock:
+            if ready:
+                self.__ready.add(account.demat)
+            else:
+                self.__ready.discard(account.demat)
+
+    def logged_in(self):
+        with self.__lock:
+            return [
+                self.__sessions[demat][1:]
+                for demat in self.__ready
+                if demat in self.__sessions
+            ]
+
+    def __len__(self):
+        with self.__lock:
+            return len(self.__sessions)
+
+
+class Daemon:
+    def __init__(
+        self,
+        path=login_file,
+        client_type="",
+        workers=None,
+        ttl=None,
+        keep_alive=None,
+    ):
+        self.path = path
+        self.client_type = client_type
+        self.workers = workers or engine.workers_
+        self.keep_alive = keep_alive_ if keep_alive is None else keep_alive
+        self.sessions = Sessions()
+        self.coalescer = Coalescer(ttl_ if ttl is None else ttl)
+        self.metrics = metrics.RunMetrics("daemon")
+        self.started = time.time()
+        self.__stop = threading.Event()
+        throttle.observers_.append(self.metrics)
+
+    def accounts(self, wanted=None, skip_apply=False):
+        # The workbook is only parsed again after it has been saved.
+        accounts, _ = load_accounts(self.path)
+        return select_accounts(xl.get_accounts(accounts, skip_apply=skip_apply), wanted)
+
+    def run(self, operation, work, accounts, key=(), ttl=None, fresh=False):
+        columns = xl.reports[operation][1]
+
+        def one(account):
+            def locked():
+                ms, lock = self.sessions.get(account, self.client_type)
+                with lock:
+                    ready = ms.login()
+                    self.sessions.mark(account, ready)
+                    if not ready:
+                        return (
+                            [
+                                [
+                                    ms.client_id,
+                                    account.name,
+                                    account.demat,
+                                    ms.status,
+                                    *[None] * (len(columns) - 4),
+                                ]
+                            ],
+                            ms.status,
+                            False,
+                        )
+                    return work(account, ms)
+
+            return self.coalescer.get(
+                (operation, account.demat, *key), locked, ttl, fresh
+            )
+
+        start = time.perf_counter()
+        results = list(engine.run(one, accounts, self.workers))
+        return {
+            "operation": operation,
+            "columns": columns,
+            "rows": [row for rows, status, done in results for row in rows],
+            "accounts": len(accounts),
+            "failed": sum(1 for rows, status, done in results if not done),
+            "seconds": round(time.perf_counter() - start, 3),
+        }
+
+    def warm(self):
+        # Logs every account in up front; the capital list is loaded by the
+        # first one and the bank list by the first application.
+        result = self.status()
+        logging.info(
+            f"Warmed up {result['accounts']} accounts in {result['seconds']:.2f}s, "
+            f"{result['failed']} couldn't log in"
+        )
+        return result
+
+    def status(self, wanted=None, fresh=False):
+        def work(account, ms):
+            return (
+                [[ms.client_id, account.name, account.demat, ms.status]],
+                ms.status,
+                True,
+            )
+
+        return self.run("status", work, self.accounts(wanted), fresh=fresh)
+
+    def holdings(self, wanted=None, fresh=False):
+        def work(account, ms):
+            rows = ms.get_share_rows()
+            if rows is None:
+                return [[ms.client_id, account.name, account.demat, ms.status, 0, 0]]
+            snapshots_.record(account.demat, rows)
+            return rows, ms.status, True
+
+        return self.run("shares", checked(work), self.accounts(wanted), fresh=fresh)
+
+    def issues(self, wanted=None, fresh=False):
+        def work(account, ms):
+            issues = ms.get_applicable_issues()
+            if issues is None:
+                return [
+                    [ms.client_id, account.name, account.demat, ms.status] + ["NA"] * 3
+                ]
+            rows = [
+                [
+                    ms.client_id,
+                    account.name,
+                    account.demat,
+                    item["scrip"],
+                    item["shareGroupName"],
+                    item["shareTypeName"],
+                    item.get("reservationTypeName", "NA"),
+                ]
+                for item in issues
+            ]
+            return rows, ms.status, True
+
+        accounts = self.accounts(wanted, skip_apply=True)
+        return self.run("issues", checked(work), accounts, fresh=fresh)
+
+    def application_status(self, scrips, wanted=None, fresh=False):
+        scrips = tuple(scrips)
+
+        def work(account, ms):
+            statuses = xl.application_statuses(ms, account, scrips)
+            rows = [
+                [ms.client_id, account.name, account.demat, scrip, statuses[scrip]]
+                for scrip in scrips
+            ]
+            if any(status in xl.failed_statuses for status in statuses.values()):
+                return rows
+            return rows, ms.status, True
+
+        accounts = self.accounts(wanted, skip_apply=True)
+        return self.run("app-status", checked(work), accounts, scrips, fresh=fresh)
+
+    def apply(self, scrip, qty, wanted=None):
+        # Never answered from the cache, but two requests for the same
+        # account and scrip still only send one application.
+        def work(account, ms):
+            ms.applied = False
+            ms.get_applicable_issues()
+            ms.apply(scrip, qty)
+            rows = [[ms.client_id, account.name, account.demat, scrip, ms.status]]
+            key = apply_key(scrip, issues_.get(scrip))
+            journal_.record("apply", key, account.demat, ms.status, ms.applied, rows)
+            return rows, ms.status, ms.applied
+
+        accounts = self.accounts(wanted, skip_apply=True)
+        result = self.run("apply", work, accounts, (scrip,), ttl=0)
+        # The issue list and statuses of these accounts just changed.
+        for account in accounts:
+            self.coalescer.forget("issues", account.demat)
+            self.coalescer.forget("app-status", account.demat)
+        return result
+
+    def health(self):
+        return {
+            "ok": True,
+            "uptime": round(time.time() - self.started, 1),
+            "accounts": len(self.accounts()),
+            "sessions": len(self.sessions),
+            "logged_in": len(self.sessions.logged_in()),
+            "cache_hits": self.coalescer.hits,
+            "coalesced": self.coalescer.shared,
+        }
+
+    def keep_warm(self):
+        # Keeps pooled connections open and renews expired logins in the
+        # background, so the next query doesn't pay for either.
+        while not self.__stop.wait(self.keep_alive):
+            for ms, lock in self.sessions.logged_in():
+                if self.__stop.is_set():
+                    return
+                with lock:
+                    ms.keep_alive()
+
+    def start(self):
+        if self.keep_alive > 0:
+            threading.Thread(target=self.keep_warm, daemon=True).start()
+
+    def stop(self):
+        self.__stop.set()
+        throttle.observers_.remove(self.metrics)
+
+
+def checked(work):
+    # A failed request becomes a row with the error instead of a 500, and
+    # isn't cached, so the next query tries again.
+    def wrapper(account, ms):
+        result = work(account, ms)
+        if isinstance(result, list):
+            return result, ms.status, False
+        return result
+
+    return wrapper
+
+
+def words(query, name):
+    values = query.get(name) or []
+    return [
+        word.strip() for value in values for word in value.split(",") if word.strip()
+    ]
+
+
+class DaemonHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    check_host = True
+
+    def log_message(self, format, *args):
+        logging.debug(f"{self.command} {self.path} " + format % args)
+
+    def do_GET(self):
+        self.route("GET")
+
+    def do_POST(self):
+        self.route("POST")
+
+    def send(self, status, body, content_type="application/json"):
+        data = (
+            body if isinstance(body, str) else json.dumps(body, default=str)
+        ).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def read_body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length) or b"{}") if length else {}
+
+    def authorized(self):
+        if not self.server.token:
+            return True
+        given = self.headers.get("Authorization", "")
+        return hmac.compare_digest(given, f"Bearer {self.server.token}")
+
+    def foreign(self):
+        # Requests a web page makes from the operator's browser: they carry
+        # an Origin, or, when rebinding a DNS name to 127.0.0.1, that name
+        # as the Host.
+        if self.headers.get("Origin") is not None:
+            return True
+        host = self.headers.get("Host")
+        if not self.check_host or self.server.token or host is None:
+            return False
+        return urlparse(f"//{host}").hostname not in loopback_
+
+    def route(self, method):
+        daemon = self.server.state
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        wanted = ",".join(words(query, "accounts")) or None
+        fresh = query.get("fresh", ["0"])[-1].lower() in ("1", "true", "yes")
+
+        if self.foreign():
+            return self.send(403, {"error": "Requests from web pages are refused"})
+        if not self.authorized():
+            return self.send(401, {"error": "Unauthorized"})
+        if method == "POST" and self.headers.get_content_type() != "application/json":
+            return self.send(415, {"error": "Content-Type must be application/json"})
+
+        try:
+            body = self.read_body() if method == "POST" else {}
+            if (method, url.path) == ("GET", "/health"):
+                return self.send(200, daemon.health())
+            if (method, url.path) == ("GET", "/metrics"):
+                return self.send(
+                    200,
+                    daemon.metrics.to_openmetrics(),
+                    "application/openmetrics-text; version=1.0.0; charset=utf-8",
+                )
+            if (method, url.path) == ("GET", "/status"):
+                return self.send(200, daemon.status(wanted, fresh))
+            if (method, url.path) == ("GET", "/holdings"):
+                return self.send(200, daemon.holdings(wanted, fresh))
+            if (method, url.path) == ("GET", "/issues"):
+                return self.send(200, daemon.issues(wanted, fresh))
+            if (method, url.path) == ("GET", "/app-status"):
+                scrips = words(query, "scrip")
+                if not scrips:
+                    return self.send(400, {"error": "scrip is required"})
+                return self.send(200, daemon.application_status(scrips, wanted, fresh))
+            if (method, url.path) == ("POST", "/apply"):
+                if not self.server.token:
+                    return self.send(
+                        403, {"error": "Set MEROSHARE_DAEMON_TOKEN to allow /apply"}
+                    )
+                if not body.get("scrip") or not body.get("qty"):
+                    return self.send(400, {"error": "scrip and qty are required"})
+                accounts = body.get("accounts")
+                if isinstance(accounts, list):
+                    accounts = ",".join(str(account) for account in accounts)
+                return self.send(
+                    200, daemon.apply(body["scrip"], int(body["qty"]), accounts)
+                )
+        except (ValueError, TypeError) as error:
+            return self.send(400, {"error": str(error)})
+        except Exception as error:
+            logging.error(f"{method} {url.path} failed: {error}")
+            return self.send(500, {"error": str(error)})
+
+        self.send(404, {"error": f"No such endpoint: {method} {url.path}"})
+
+
+class UnixDaemonHandler(DaemonHandler):
+    # Unix sockets have no Nagle to turn off, and only the owner can connect
+    # whatever Host is sent.
+    disable_nagle_algorithm = False
+    check_host = False
+
+
+class UnixHTTPServer(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+
+def serve(daemon, host=host_, port=port_, socket_path=None, token=token_):
+    if socket_path:
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+        server = UnixHTTPServer(socket_path, UnixDaemonHandler)
+        os.chmod(socket_path, 0o600)
+        address = socket_path
+    else:
+        server = ThreadingHTTPServer((host, port), DaemonHandler)
+        server.daemon_threads = True
+        address = "http://{}:{}".format(*server.server_address[:2])
+    server.state = daemon
+    server.token = token
+    return server, address
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Keep MeroShare sessions warm and answer queries over a local API."
+    )
+    parser.add_argument("--host", default=host_)
+    parser.add_argument("--port", type=int, default=port_, help="0 picks a free port")
+    parser.add_argument(
+        "--socket", help="listen on this Unix socket instead of a TCP port"
+    )
+    parser.add_argument("--login-file", default=login_file)
+    parser.add_argument("--workers", type=int, default=engine.workers_)
+    parser.add_argument(
+        "--ttl",
+        type=float,
+        default=ttl_,
+        help="seconds a successful answer is reused (0 to always ask the server)",
+    )
+    parser.add_argument(
+        "--keep-alive",
+        type=float,
+        default=keep_alive_,
+        help="seconds between keep-alive requests for logged-in clients (0 is off)",
+    )
+    parser.add_argument(
+        "--no-warm",
+        action="store_true",
+        help="log clients in on their first query instead of at start",
+    )
+    args = parser.parse_args(argv)
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
+    configure_logging()
+
+    daemon = Daemon(args.login_file, "", args.workers, args.ttl, args.keep_alive)
+    if not args.no_warm:
+        daemon.warm()
+    daemon.start()
+
+    server, address = serve(daemon, args.host, args.port, args.socket)
+    if args.host not in loopback_ and not args.socket:
+        logging.warning(
+            f"Listening on {args.host}: anyone who can reach it can apply for "
+            "IPOs, set MEROSHARE_DAEMON_TOKEN"
+        )
+    # The first line tells scripts starting the daemon where to find it.
+    print(address, flush=True)
+    logging.info(f"Serving on {address}")
+
+    signal.signal(signal.SIGTERM, lambda *args: sys.exit(0))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        threading.Event().wait()
+    except (KeyboardInterrupt, SystemExit):
+        pass
+    finally:
+        server.shutdown()
+        server.server_close()
+        daemon.stop()
+        daemon.metrics.log(logging)
+        if args.socket and os.path.exists(args.socket):
+            os.remove(args.socket)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
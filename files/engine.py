@@ -0,0 +1,161 @@
+import logging
+import os
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import retry_policy
+except ImportError:
+    from files import retry_policy
+
+
+def worker_count(name, default):
+    # A pipeline stage without workers would leave the others waiting forever.
+    workers = int(os.environ.get(name, default))
+    if workers < 1:
+        raise ValueError(f"{name} must be at least 1, got {workers}")
+    return workers
+
+
+workers_ = worker_count("MEROSHARE_WORKERS", 8)
+# Threads for the final submit stage of a pipelined apply; kept low since the
+# server limits how fast applications are accepted anyway.
+apply_workers_ = worker_count("MEROSHARE_APPLY_WORKERS", 2)
+
+
+def run(work, items, workers: int = None):
+    # Runs `work` for every item on a bounded pool and yields the results in
+    # the same order as `items`, whatever order the accounts finish in.
+    workers = workers or workers_
+    items = list(items)
+    retry_policy.budget_.reset()
+
+    if workers <= 1 or len(items) <= 1:
+        for item in items:
+            yield work(item)
+        return
+
+    with ThreadPoolExecutor(max_workers=min(workers, len(items))) as executor:
+        futures = [executor.submit(work, item) for item in items]
+        try:
+            for future in futures:
+                yield future.result()
+        except Exception as error:
+            logging.error(f"Batch aborted: {error}")
+            for future in futures:
+                future.cancel()
+            raise
+
+
+class Finished:
+    # Returned by a pipeline stage when an item needs no further stages (a
+    # failed login, say); the result skips straight to the output.
+    __slots__ = ("result",)
+
+    def __init__(self, result):
+        self.result = result
+
+
+class Failed:
+    __slots__ = ("error",)
+
+    def __init__(self, error):
+        self.error = error
+
+
+def pipeline(stages, items, queue_size: int = None):
+    # Runs every item through `stages`, a list of (work, workers) pairs, each
+    # on its own threads with a bounded queue in front, so a slow stage holds
+    # back the ones before it instead of piling up work. Results are yielded
+    # in the same order as `items`, like `run`.
+    items = list(items)
+    retry_policy.budget_.reset()
+    if not items:
+        return
+
+    abort = threading.Event()
+    queues = [
+        queue.Queue(maxsize=queue_size or max(2, 2 * workers))
+        for work, workers in stages
+    ]
+    remaining = [workers for work, workers in stages]
+    results = {}
+    ready = threading.Condition()
+    lock = threading.Lock()
+
+    def finish(index, value):
+        with ready:
+            results[index] = value
+            ready.notify_all()
+
+    def put(target, entry):
+        while not abort.is_set():
+            try:
+                target.put(entry, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def feed():
+        for index, item in enumerate(items):
+            if abort.is_set():
+                break
+            put(queues[0], (index, item))
+        for _ in range(stages[0][1]):
+            put(queues[0], None)
+
+    def serve(stage):
+        work = stages[stage][0]
+        last = stage == len(stages) - 1
+        while True:
+            try:
+                entry = queues[stage].get(timeout=0.1)
+            except queue.Empty:
+                if abort.is_set():
+                    return
+                continue
+            if entry is None:
+                break
+
+            index, value = entry
+            if not isinstance(value, (Finished, Failed)) and not abort.is_set():
+                try:
+                    value = work(value)
+                except Exception as error:
+                    value = Failed(error)
+
+            if last or isinstance(value, (Finished, Failed)):
+                finish(index, value)
+            else:
+                put(queues[stage + 1], (index, value))
+
+        # The last thread of a stage to finish tells the next stage.
+        with lock:
+            remaining[stage] -= 1
+            done = remaining[stage] == 0
+        if done and not last:
+            for _ in range(stages[stage + 1][1]):
+                put(queues[stage + 1], None)
+
+    threads = [threading.Thread(target=feed, daemon=True)] + [
+        threading.Thread(target=serve, args=(stage,), daemon=True)
+        for stage, (work, workers) in enumerate(stages)
+        for _ in range(workers)
+    ]
+    for thread in threads:
+        thread.start()
+
+    try:
+        for index in range(len(items)):
+            with ready:
+                while index not in results:
+                    ready.wait()
+                value = results.pop(index)
+
+            if isinstance(value, Failed):
+                logging.error(f"Batch aborted: {value.error}")
+                raise value.error
+            yield value.result if isinstance(value, Finished) else value
+    finally:
+        abort.set()
@@ -0,0 +1,135 @@
+import contextvars
+import logging
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+try:
+    import metrics
+except ImportError:
+    from files import metrics
+
+# Hedged reads: when a read takes longer than this percentile (0-100) of its
+# recent latencies, the same request is sent again and whichever answers
+# first wins. 0 turns hedging off. Kept as the fraction metrics.percentile()
+# takes.
+percentile_ = float(os.environ.get("MEROSHARE_HEDGE_PERCENTILE", 0)) / 100
+# Used until an endpoint has `min_samples_` latencies to go by.
+delay_ = float(os.environ.get("MEROSHARE_HEDGE_DELAY", 2))
+min_delay_ = float(os.environ.get("MEROSHARE_HEDGE_MIN_DELAY", 0.05))
+min_samples_ = int(os.environ.get("MEROSHARE_HEDGE_MIN_SAMPLES", 20))
+window_ = int(os.environ.get("MEROSHARE_HEDGE_WINDOW", 200))
+workers_ = int(os.environ.get("MEROSHARE_HEDGE_WORKERS", 32))
+
+stats_lock = threading.Lock()
+stats_ = {"requests": 0, "hedged": 0, "won": 0, "held": 0}
+
+
+class LatencyTracker:
+    def __init__(self, window: int):
+        self.window = window
+        self.__lock = threading.Lock()
+        self.__latencies = {}
+
+    def record(self, key, seconds):
+        with self.__lock:
+            if key not in self.__latencies:
+                self.__latencies[key] = deque(maxlen=self.window)
+            self.__latencies[key].append(seconds)
+
+    def latencies(self, key):
+        with self.__lock:
+            return list(self.__latencies.get(key, ()))
+
+
+tracker_ = LatencyTracker(window_)
+
+executor_lock = threading.Lock()
+executor_ = None
+
+
+def get_executor():
+    global executor_
+    with executor_lock:
+        if executor_ is None:
+            executor_ = ThreadPoolExecutor(
+                max_workers=workers_, thread_name_prefix="hedge"
+            )
+        return executor_
+
+
+def hedge_delay(key):
+    latencies = tracker_.latencies(key)
+    if len(latencies) < min_samples_:
+        return max(min_delay_, delay_)
+    return max(min_delay_, metrics.percentile(latencies, percentile_))
+
+
+def timed(send, key, *args, **kwargs):
+    start = time.perf_counter()
+    response = send(*args, **kwargs)
+    tracker_.record(key, time.perf_counter() - start)
+    return response
+
+
+def discard(future):
+    if not future.cancelled() and future.exception() is None:
+        future.result().close()
+
+
+def call(send, key, *args, admit=None, **kwargs):
+    # Only for requests that are safe to send twice, and already let through
+    # the client's own limits, so the latencies are the server's alone. Both
+    # copies run on the hedge pool; the caller waits for the first answer and
+    # the slower copy is closed whenever it finishes. `admit()` says whether
+    # the second copy may go out right now; if not, it isn't sent.
+    if not percentile_:
+        return timed(send, key, *args, **kwargs)
+
+    with stats_lock:
+        stats_["requests"] += 1
+
+    executor = get_executor()
+    first = executor.submit(
+        contextvars.copy_context().run, timed, send, key, *args, **kwargs
+    )
+    done, _ = wait([first], timeout=hedge_delay(key))
+    if done:
+        return first.result()
+
+    if admit is not None and not admit():
+        with stats_lock:
+            stats_["held"] += 1
+        return first.result()
+
+    with stats_lock:
+        stats_["hedged"] += 1
+    logging.debug(f"Hedging slow request to {key}")
+    second = executor.submit(
+        contextvars.copy_context().run, timed, send, key, *args, **kwargs
+    )
+
+    pending = {first, second}
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            if future.exception() is None or not pending:
+                for other in pending:
+                    other.add_done_callback(discard)
+                if future is second and future.exception() is None:
+                    with stats_lock:
+                        stats_["won"] += 1
+                return future.result()
+
+
+def log_stats(logger):
+    with stats_lock:
+        stats = dict(stats_)
+    if stats["hedged"] or stats["held"]:
+        logger.info(
+            f"Hedged requests: {stats['hedged']} of {stats['requests']} reads hedged, "
+            f"the hedge answered first {stats['won']} times, {stats['held']} not "
+            "hedged because of the rate limits"
+        )
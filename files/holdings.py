@@ -0,0 +1,113 @@
+import logging
+
+try:
+    import sinks
+except ImportError:
+    from files import sinks
+
+share_columns = [
+    "Client ID",
+    "Name",
+    "DMAT No",
+    "Script",
+    "Current Balance",
+    "Free Balance",
+]
+key_columns = share_columns[:4]
+balance_columns = share_columns[4:]
+
+# File name suffix of each consolidated table.
+tables_ = {
+    "by_scrip": " - By Scrip",
+    "by_account": " - By Account",
+    "pivot": " - Pivot",
+}
+
+
+def share_frame(rows):
+    # The same rows are repeated for thousands of accounts, so the keys are
+    # kept as categoricals and the balances as numbers, whatever type the
+    # server sent them as.
+    import numpy as np
+    import pandas as pd
+
+    frame = pd.DataFrame.from_records(list(rows), columns=share_columns)
+    for column in key_columns:
+        frame[column] = frame[column].astype("category")
+    for column in balance_columns:
+        try:
+            numbers = np.asarray(frame[column].to_numpy(), dtype="float64")
+        except (TypeError, ValueError):
+            numbers = pd.to_numeric(frame[column], errors="coerce").to_numpy()
+        numbers = np.nan_to_num(numbers)
+        # Whole units fit a small integer type; fractional ones stay float64
+        # so totals over many accounts don't lose precision.
+        if (numbers % 1 == 0).all():
+            numbers = pd.to_numeric(numbers.astype("int64"), downcast="integer")
+        frame[column] = numbers
+    return frame
+
+
+def snapshot_frame(store, taken, demats=None):
+    # A day's share lists from the snapshot store, which only has the lists
+    # that were read successfully.
+    stored, rows = store.load(taken)
+    if demats is not None:
+        demats = {str(demat) for demat in demats}
+    return share_frame(
+        (client_id, name, demat, scrip, current, free)
+        for demat, scrip, client_id, name, current, free in rows
+        if demats is None or demat in demats
+    )
+
+
+def consolidate(frame):
+    # Per-scrip totals, per-account totals and a scrip x account table of
+    # current balances, all from one grouped pass over the frame.
+    by_scrip = frame.groupby("Script", observed=True).agg(
+        **{
+            "Accounts": ("DMAT No", "nunique"),
+            "Current Balance": ("Current Balance", "sum"),
+            "Free Balance": ("Free Balance", "sum"),
+        }
+    )
+    by_account = frame.groupby(["Client ID", "Name", "DMAT No"], observed=True).agg(
+        **{
+            "Scrips": ("Script", "nunique"),
+            "Current Balance": ("Current Balance", "sum"),
+            "Free Balance": ("Free Balance", "sum"),
+        }
+    )
+    pivot = (
+        frame.groupby(["Script", "DMAT No"], observed=True)["Current Balance"]
+        .sum()
+        .unstack(fill_value=0)
+    )
+    pivot.columns = pivot.columns.astype(str)
+    return {
+        "by_scrip": by_scrip.sort_values("Current Balance", ascending=False),
+        "by_account": by_account.sort_values("Current Balance", ascending=False),
+        "pivot": pivot,
+    }
+
+
+def export(tables, name, output_format="xlsx"):
+    paths = []
+    for table, suffix in tables_.items():
+        frame = tables[table].reset_index()
+        sink = sinks.open_sink(output_format, name + suffix, list(frame.columns))
+        try:
+            for row in frame.itertuples(index=False, name=None):
+                sink.write(row)
+        finally:
+            sink.close()
+        paths.append(name + suffix + sinks.sinks_[output_format].extension)
+    return paths
+
+
+def log_summary(tables, logger=logging):
+    by_scrip, by_account = tables["by_scrip"], tables["by_account"]
+    logger.info(
+        f"Consolidated {len(by_account)} accounts holding {len(by_scrip)} scrips, "
+        f"{by_scrip['Current Balance'].sum():,.0f} units in total"
+    )
@@ -0,0 +1,52 @@
+import threading
+
+# Fields that differ between accounts and so can't be shared in the catalog.
+account_fields = ("action", "statusName", "reservationTypeName")
+
+
+class IssueCatalog:
+    def __init__(self):
+        self.__lock = threading.Lock()
+        self.__issues = {}
+        self.__pending = {}
+
+    def add(self, issues):
+        with self.__lock:
+            for issue in issues or []:
+                self.__issues[str(issue.get("scrip"))] = {
+                    key: value
+                    for key, value in issue.items()
+                    if key not in account_fields
+                }
+
+    def get(self, scrip):
+        with self.__lock:
+            return self.__issues.get(str(scrip))
+
+    def resolve(self, scrip, fetch):
+        # Looks the scrip up once per batch: the first worker to ask fetches
+        # the issue list, the others wait for it instead of asking again.
+        scrip = str(scrip)
+        with self.__lock:
+            if scrip in self.__issues:
+                return self.__issues[scrip]
+            event = self.__pending.get(scrip)
+            owner = event is None
+            if owner:
+                event = self.__pending[scrip] = threading.Event()
+
+        if not owner:
+            event.wait()
+            return self.get(scrip)
+
+        try:
+            self.add(fetch())
+        finally:
+            with self.__lock:
+                del self.__pending[scrip]
+            event.set()
+        return self.get(scrip)
+
+    def clear(self):
+        with self.__lock:
+            self.__issues = {}
@@ -0,0 +1,123 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+journal_file = os.environ.get("MEROSHARE_JOURNAL", "files/journal.sqlite3")
+resume_hours_ = float(os.environ.get("MEROSHARE_RESUME_HOURS", 12))
+
+
+class Journal:
+    def __init__(self, path):
+        self.path = path
+        self.__lock = threading.Lock()
+        self.__db = None
+
+    def __connect(self):
+        if self.__db is None:
+            # Shards running as separate processes share the journal, so wait
+            # for each other's writes instead of failing on a locked database.
+            self.__db = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            self.__db.execute("""
+                CREATE TABLE IF NOT EXISTS outcomes (
+                    operation TEXT NOT NULL,
+                    scrip TEXT NOT NULL,
+                    demat TEXT NOT NULL,
+                    status TEXT,
+                    done INTEGER NOT NULL,
+                    rows TEXT NOT NULL,
+                    updated REAL NOT NULL,
+                    PRIMARY KEY (operation, scrip, demat)
+                )
+                """)
+        return self.__db
+
+    def record(self, operation, scrip, demat, status, done, rows):
+        with self.__lock:
+            db = self.__connect()
+            with db:
+                db.execute(
+                    "INSERT OR REPLACE INTO outcomes VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        operation,
+                        str(scrip or ""),
+                        str(demat),
+                        None if status is None else str(status),
+                        int(bool(done)),
+                        json.dumps([list(row) for row in rows], default=str),
+                        time.time(),
+                    ),
+                )
+
+    def completed(self, operation, scrip, demat, max_age: float = None):
+        with self.__lock:
+            row = (
+                self.__connect()
+                .execute(
+                    "SELECT rows, updated FROM outcomes WHERE operation = ? "
+                    "AND scrip = ? AND demat = ? AND done = 1",
+                    (operation, str(scrip or ""), str(demat)),
+                )
+                .fetchone()
+            )
+
+        if row is None or (max_age is not None and time.time() - row[1] > max_age):
+            return None
+        return json.loads(row[0])
+
+    def outcome(self, operation, scrip, demat):
+        with self.__lock:
+            row = (
+                self.__connect()
+                .execute(
+                    "SELECT status FROM outcomes WHERE operation = ? "
+                    "AND scrip = ? AND demat = ? AND done = 1",
+                    (operation, str(scrip or ""), str(demat)),
+                )
+                .fetchone()
+            )
+        return row[0] if row else None
+
+    def close(self):
+        with self.__lock:
+            if self.__db is not None:
+                self.__db.close()
+                self.__db = None
+
+
+journal_ = Journal(journal_file)
+
+
+def apply_key(scrip, issue=None):
+    # Apply outcomes are kept for good, so they are tied to the issue itself:
+    # a later FPO or right share of the same scrip is a new application.
+    share_id = (issue or {}).get("companyShareId")
+    return str(scrip) if share_id is None else f"{scrip}#{share_id}"
+
+
+def allotment_key(scrip, application):
+    # Allotments are kept for good too, so they are tied to the application
+    # the search found for the scrip.
+    form_id = (application or {}).get("applicantFormId")
+    return str(scrip) if form_id is None else f"{scrip}#{form_id}"
+
+
+def journaled(operation, scrip, work, resume=False, max_age=None):
+    # Wraps a per-account `work(account) -> (rows, status, done)` so every
+    # outcome is recorded, and with `resume` accounts already done are answered
+    # from the journal without logging in again.
+    if max_age is None and operation != "apply":
+        max_age = resume_hours_ * 60 * 60
+
+    def run(account):
+        if resume:
+            rows = journal_.completed(operation, scrip, account.demat, max_age)
+            if rows is not None:
+                return rows
+
+        rows, status, done = work(account)
+        journal_.record(operation, scrip, account.demat, status, done, rows)
+        return rows
+
+    return run
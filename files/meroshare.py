@@ -1,12 +1,32 @@
 import logging
-from tenacity import retry, stop_after_attempt, wait_fixed
-import requests
 import json
-import pandas as pd
-
-logging.basicConfig(format="%(asctime)s %(message)s", level=logging.INFO)
-
-BaseURL_ = "https://webbackend.cdsc.com.np/api"
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import throttle
+    from capitals import CapitalRegistry
+    from banks import BankCache, bank_cache_file
+    from auth_cache import TokenStore, token_file, token_key
+    from issues import IssueCatalog
+    from holdings import share_frame
+    from paging import paginate
+    import session_pool
+    import retry_policy
+    import hedging
+    import metrics
+except ImportError:
+    from files.capitals import CapitalRegistry
+    from files.banks import BankCache, bank_cache_file
+    from files.auth_cache import TokenStore, token_file, token_key
+    from files.issues import IssueCatalog
+    from files.holdings import share_frame
+    from files.paging import paginate
+    from files import throttle, session_pool, retry_policy, hedging, metrics
+
+BaseURL_ = os.environ.get(
+    "MEROSHARE_BASE_URL", "https://webbackend.cdsc.com.np/api"
+).rstrip("/")
 
 headers_ = {
     "Accept": "application/json, text/plain, */*",
@@ -23,16 +43,43 @@ headers_ = {
     "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/134.0.0.0 Safari/537.36",
 }
 
-cap_file = "files/capitals.json"
+share_page_size = 200
+issue_page_size = 10
+application_page_size = 200
+detail_workers_ = 4
+# What get_application_statuses() reports when it couldn't find out.
+failed_statuses = {"Application status request failed.", "Report rqeuest Failed"}
+
+cap_file = os.environ.get("MEROSHARE_CAPITALS_FILE", "files/capitals.json")
 ca_file = "files/cdsc-com-np-chain.pem"
 
 
+def configure_logging(level=logging.INFO):
+    # Left to the entry points, so importing this module has no side effects.
+    logging.basicConfig(format="%(asctime)s %(message)s", level=level)
+
+
 def update_capital_list():
-    response = requests.request(
-        "GET", f"{BaseURL_}/meroShare/capital/", headers=headers_
+    response = retry_policy.call(
+        session_pool.mount(throttle.new_session(), ca_file).get,
+        f"{BaseURL_}/meroShare/capital/",
+        headers=headers_,
     )
-    with open(cap_file, "w") as cap_file_:
-        json.dump(response.json(), cap_file_)
+    response.raise_for_status()
+    return response.json()
+
+
+capitals_ = CapitalRegistry(cap_file, update_capital_list)
+banks_ = BankCache(bank_cache_file, token_key)
+tokens_ = TokenStore(token_file, token_key)
+issues_ = IssueCatalog()
+
+
+def is_applied(issue):
+    # An issue carries an action once the account has applied for it; only
+    # "reapply" means the earlier application has to be done again.
+    action = str(issue.get("action") or "").lower()
+    return bool(action) and action != "reapply"
 
 
 class MeroShare:
@@ -54,6 +101,7 @@ class MeroShare:
         self.__password = password
         self.__auth_token = None
         self.status = None
+        self.applied = False
         self.__capital_id = self.get_capital_id()
         self.__dmat = "130" + self.__dpid + self.__username
         self.client_id = client_id
@@ -61,32 +109,21 @@ class MeroShare:
         self.__pin = pin
         self.__applicable_issues = None
         self.__account = None
+        self.__bank_account = None
         self.bank = bank
 
-        self.__session = requests.Session()
+        self.__session = session_pool.mount(throttle.new_session(), ca_file)
         self.__session.headers.update(headers_)
+        # The demat, since names are optional and needn't be unique.
+        self.__session.account = self.__dmat
 
-    @retry(stop=stop_after_attempt(3), wait=wait_fixed(3), reraise=True)
     def get_capital_id(self):
-        updated = False
-        while True:
-            try:
-                return [
-                    response["id"]
-                    for response in json.load(open(cap_file))
-                    if response["code"] == self.__dpid
-                ][0]
-            except Exception as error:
-                logging.info(f"Error finding Capital for Acc: {self.__name}")
-                logging.error(error)
-                if updated:
-                    return None
-                logging.info("Updating Capitals List Cache")
-                update_capital_list()
-                updated = True
-
-    @retry(stop=stop_after_attempt(3), wait=wait_fixed(3), reraise=True)
-    def login(self) -> bool:
+        capital_id = capitals_.get(self.__dpid)
+        if capital_id is None:
+            logging.info(f"Error finding Capital for Acc: {self.__name}")
+        return capital_id
+
+    def login(self, force: bool = False) -> bool:
         assert (
             self.__username and self.__password and self.__dpid
         ), "Username, password and DPID required!"
@@ -96,32 +133,43 @@ class MeroShare:
             self.status = "Problem Finding Capital"
             return False
 
-        with self.__session as sess:
-            data = json.dumps(
-                {
-                    "clientId": self.__capital_id,
-                    "username": self.__username,
-                    "password": self.__password,
-                }
-            )
+        cached = None if force else tokens_.get(self.__capital_id, self.__username)
+        if cached:
+            self.__auth_token, self.status = cached
+            self.__session.headers.update({"Authorization": self.__auth_token})
+            logging.info(f"Reusing login token for Account: {self.__name}")
+            return True
 
-            try:
-                login_req = sess.post(
-                    f"{BaseURL_}/meroShare/auth/", data=data, verify=ca_file
-                )
-                self.status = login_req.json()["message"]
+        self.__auth_token = None
+        data = json.dumps(
+            {
+                "clientId": self.__capital_id,
+                "username": self.__username,
+                "password": self.__password,
+            }
+        )
 
-                if login_req.status_code == 200:
-                    self.__auth_token = login_req.headers.get("Authorization")
-                    logging.info(f"{self.status}  Account: {self.__name}!")
-                else:
-                    logging.warning(f"{self.status} for Account: {self.__name}")
-            except Exception as error:
-                logging.info(error)
-                logging.info(
-                    f"Retrying login: ({self.login.retry.statistics.get('attempt_number')})!"
-                )
-                self.status = f"Login Failed!! {error}"
+        try:
+            login_req = retry_policy.call(
+                self.__session.request, "POST", f"{BaseURL_}/meroShare/auth/", data=data
+            )
+            self.status = login_req.json()["message"]
+
+            if login_req.status_code == 200:
+                self.__auth_token = login_req.headers.get("Authorization")
+                logging.info(f"{self.status}  Account: {self.__name}!")
+                if self.__auth_token:
+                    tokens_.put(
+                        self.__capital_id,
+                        self.__username,
+                        self.__auth_token,
+                        self.status,
+                    )
+            else:
+                logging.warning(f"{self.status} for Account: {self.__name}")
+        except Exception as error:
+            logging.info(error)
+            self.status = f"Login Failed!! {error}"
 
         if not self.__auth_token:
             return False
@@ -131,286 +179,369 @@ class MeroShare:
 
         return True
 
-    @retry(stop=stop_after_attempt(3), wait=wait_fixed(3), reraise=True)
-    def get_share_list(self):
-        with self.__session as sess:
-            data = json.dumps(
-                {
-                    "sortBy": "CCY_SHORT_NAME",
-                    "demat": [self.__dmat],
-                    "clientCode": self.__dpid,
-                    "page": 1,
-                    "size": 200,
-                    "sortAsc": "true",
-                }
+    def __request(self, method, url, idempotent=True, hedge=False, **kwargs):
+        # `hedge` is only for reads that are safe to send twice.
+        if hedge:
+            return retry_policy.call(
+                self.__hedged, method, url, idempotent=idempotent, **kwargs
+            )
+        return retry_policy.call(
+            self.__send, method, url, idempotent=idempotent, **kwargs
+        )
+
+    def __hedged(self, method, url, **kwargs):
+        # The rate limits and circuit breaker are waited for here, before the
+        # hedge clock starts; a hedge copy is only sent if they let it through
+        # straight away.
+        probe = self.__session.admit(url)
+        return hedging.call(
+            self.__send,
+            metrics.route(url),
+            method,
+            url,
+            admit=lambda: self.__session.admit(url, block=False),
+            admitted=True,
+            probe=probe,
+            **kwargs,
+        )
+
+    def __send(self, method, url, admitted=False, **kwargs):
+        response = self.__session.request(method, url, admitted=admitted, **kwargs)
+
+        if response.status_code == 401 and self.__auth_token:
+            logging.info(f"Login token expired for Account: {self.__name}")
+            tokens_.discard(self.__capital_id, self.__username)
+            if self.login(force=True):
+                response = self.__session.request(method, url, **kwargs)
+
+        return response
+
+    def __pages(self, url, payload, key, total_key, size, prefetch=False):
+        def fetch(page, size):
+            response = self.__request(
+                "POST",
+                url,
+                hedge=True,
+                data=json.dumps({**payload, "page": page, "size": size}),
+            )
+            if response.status_code != 200:
+                raise Exception(f"Request failed with status {response.status_code}")
+            response_json = response.json()
+            return response_json.get(key) or [], response_json.get(total_key)
+
+        return paginate(fetch, size, prefetch)
+
+    def iter_shares(self):
+        items = self.__pages(
+            f"{BaseURL_}/meroShareView/myShare/",
+            {
+                "sortBy": "CCY_SHORT_NAME",
+                "demat": [self.__dmat],
+                "clientCode": self.__dpid,
+                "sortAsc": "true",
+            },
+            "meroShareDematShare",
+            "totalItems",
+            share_page_size,
+            prefetch=True,
+        )
+
+        for item in items:
+            logging.info(
+                f'Account: {self.__name} -> Script: {item.get("script")}, CurrentBalance: {item.get("currentBalance")}, FreeBalance: {item["freeBalance"]}'
+            )
+            yield (
+                self.client_id,
+                self.__name,
+                self.__dmat,
+                item["script"],
+                item["currentBalance"],
+                item["freeBalance"],
             )
 
-            try:
-                myShare = sess.post(
-                    f"{BaseURL_}/meroShareView/myShare/", data=data, verify=ca_file
-                )
-
-                pd_list = pd.DataFrame(
-                    columns=[
-                        "Client ID",
-                        "Name",
-                        "DMAT No",
-                        "Script",
-                        "Current Balance",
-                        "Free Balance",
-                    ]
-                )
-
-                for item in myShare.json()["meroShareDematShare"]:
-                    logging.info(
-                        f'Account: {self.__name} -> Script: {item.get("script")}, CurrentBalance: {item.get("currentBalance")}, FreeBalance: {item["freeBalance"]}'
-                    )
-                    data = (
-                        [self.client_id]
-                        + [self.__name]
-                        + [self.__dmat]
-                        + [item["script"]]
-                        + [item["currentBalance"]]
-                        + [item["freeBalance"]]
-                    )
-                    pd_list.loc[len(pd_list)] = data
+    def get_share_rows(self):
+        try:
+            return list(self.iter_shares())
+        except Exception as error:
+            self.status = "Error Getting MyShare List"
+            logging.info(self.status)
+            logging.error(error)
 
-                return pd_list
-            except Exception as error:
-                self.status = "Error Getting MyShare List"
-                logging.info(self.status)
-                logging.error(error)
+    def get_share_list(self):
+        rows = self.get_share_rows()
+        if rows is not None:
+            return share_frame(rows)
 
-    @retry(stop=stop_after_attempt(3), wait=wait_fixed(3), reraise=True)
     def get_applicable_issues(self):
-        with self.__session as sess:
-            data = json.dumps(
+        data = {
+            "filterFieldParams": [
                 {
-                    "filterFieldParams": [
-                        {
-                            "key": "companyIssue.companyISIN.script",
-                            "alias": "Scrip",
-                        },
-                        {
-                            "key": "companyIssue.companyISIN.company.name",
-                            "alias": "Company Name",
-                        },
-                        {
-                            "key": "companyIssue.assignedToClient.name",
-                            "value": "",
-                            "alias": "Issue Manager",
-                        },
-                    ],
-                    "page": 1,
-                    "size": 10,
-                    "searchRoleViewConstants": "VIEW_APPLICABLE_SHARE",
-                    "filterDateParams": [
-                        {
-                            "key": "minIssueOpenDate",
-                            "condition": "",
-                            "alias": "",
-                            "value": "",
-                        },
-                        {
-                            "key": "maxIssueCloseDate",
-                            "condition": "",
-                            "alias": "",
-                            "value": "",
-                        },
-                    ],
-                }
-            )
+                    "key": "companyIssue.companyISIN.script",
+                    "alias": "Scrip",
+                },
+                {
+                    "key": "companyIssue.companyISIN.company.name",
+                    "alias": "Company Name",
+                },
+                {
+                    "key": "companyIssue.assignedToClient.name",
+                    "value": "",
+                    "alias": "Issue Manager",
+                },
+            ],
+            "searchRoleViewConstants": "VIEW_APPLICABLE_SHARE",
+            "filterDateParams": [
+                {
+                    "key": "minIssueOpenDate",
+                    "condition": "",
+                    "alias": "",
+                    "value": "",
+                },
+                {
+                    "key": "maxIssueCloseDate",
+                    "condition": "",
+                    "alias": "",
+                    "value": "",
+                },
+            ],
+        }
 
-            try:
-                self.__applicable_issues = (
-                    sess.post(
-                        f"{BaseURL_}/meroShare/companyShare/applicableIssue/",
-                        data=data,
-                        verify=ca_file,
-                    )
-                    .json()
-                    .get("object")
+        try:
+            self.__applicable_issues = list(
+                self.__pages(
+                    f"{BaseURL_}/meroShare/companyShare/applicableIssue/",
+                    data,
+                    "object",
+                    "totalCount",
+                    issue_page_size,
                 )
-            except Exception as error:
-                logging.error(error)
-                self.status = f"Applicable issues request failed! {error}"
-                logging.info({self.status})
+            )
+            issues_.add(self.__applicable_issues)
+        except Exception as error:
+            logging.error(error)
+            self.status = f"Applicable issues request failed! {error}"
+            logging.info({self.status})
+
+        logging.info(f"Appplicable Issues Obtained! Account: {self.__name}")
+        return self.__applicable_issues
+
+    def prepare_bank(self):
+        # The bank account applications are paid from. It doesn't depend on
+        # the issue, so it can be looked up before an issue opens.
+        if self.__bank_account is None:
+            bank_id = banks_.get_bank_id(
+                self.bank,
+                lambda: self.__request("GET", f"{BaseURL_}/meroShare/bank/").json(),
+            )
 
-            logging.info(f"Appplicable Issues Obtained! Account: {self.__name}")
-            return self.__applicable_issues
+            if bank_id is None:
+                self.status = "Bank name not found."
+                print(self.status)
+                return None
+
+            detail = banks_.get_detail(
+                self.__dmat,
+                bank_id,
+                lambda: self.__request(
+                    "GET", f"{BaseURL_}/meroShare/bank/{bank_id}"
+                ).json()[0],
+            )
+            self.__bank_account = (bank_id, detail)
+        return self.__bank_account
 
-    @retry(stop=stop_after_attempt(3), wait=wait_fixed(3), reraise=True)
-    def apply(self, share_id: str, qty: int):
+    def keep_alive(self):
+        # A cheap request that keeps a pooled connection (and the login) warm.
         try:
-            with self.__session as sess:
-                issue_to_apply = None
+            return self.__request("GET", f"{BaseURL_}/meroShare/bank/").ok
+        except Exception as error:
+            logging.info(f"Keep-alive failed for Account: {self.__name}: {error}")
+            return False
 
-                if not self.__applicable_issues:
-                    self.get_applicable_issues()
+    def prepare_application(self, share_id: str, qty: int):
+        # Everything an application needs before it is sent: the issue and the
+        # bank details. Returns the request body, or None with the reason in
+        # self.status.
+        try:
+            # Each account's own list: eligibility and `action` differ.
+            if not self.__applicable_issues:
+                self.get_applicable_issues()
+
+            issue_to_apply = next(
+                (
+                    issue
+                    for issue in self.__applicable_issues or []
+                    if str(issue.get("scrip")) == str(share_id)
+                ),
+                None,
+            )
 
-                for issue in self.__applicable_issues:
-                    if str(issue.get("scrip")) == share_id:
-                        issue_to_apply = issue
-                        break
+            if not issue_to_apply:
+                logging.warning(
+                    "Provided Script doesn't match any of the applicable issues!"
+                )
+                self.status = "No matching applicable issues!"
+                return None
 
-                if not issue_to_apply:
-                    logging.warning(
-                        "Provided Script doesn't match any of the applicable issues!"
-                    )
-                    self.status = "No matching applicable issues!"
-                    return self.status
+            share_id = issue_to_apply.get("companyShareId")
 
-                share_id = issue_to_apply.get("companyShareId")
+            if issue_to_apply.get("action"):
+                status = issue_to_apply.get("action")
+                self.applied = is_applied(issue_to_apply)
+                self.status = "Couldn't apply for issue! - " + status
+                logging.info(self.status)
+                return None
 
-                if issue_to_apply.get("action"):
-                    status = issue_to_apply.get("action")
-                    self.status = "Couldn't apply for issue! - " + status
-                    logging.info(self.status)
-                    return self.status
+            bank_account = self.prepare_bank()
+            if bank_account is None:
+                return None
+            bank_id, bank_specific_response_json = bank_account
 
-                bank_req = sess.get(
-                    f"{BaseURL_}/meroShare/bank/", verify=ca_file
-                ).json()
+            return json.dumps(
+                {
+                    "accountBranchId": bank_specific_response_json.get(
+                        "accountBranchId"
+                    ),
+                    "accountNumber": bank_specific_response_json.get("accountNumber"),
+                    "accountTypeId": bank_specific_response_json.get("accountTypeId"),
+                    "appliedKitta": qty,
+                    "bankId": bank_id,
+                    "boid": self.__dmat[-8:],
+                    "companyShareId": share_id,
+                    "crnNumber": self.__crn,
+                    "customerId": bank_specific_response_json.get("id"),
+                    "demat": self.__dmat,
+                    "transactionPIN": self.__pin,
+                }
+            )
 
-                bank_id = None
-                for bank_ in bank_req:
-                    if bank_["name"] == self.bank:
-                        bank_id = bank_["id"]
+        except Exception as error:
+            logging.info(error)
+            self.status = f"Apply failed! - {error}"
+            return None
 
-                if bank_id is None:
-                    self.status = "Bank name not found."
-                    print(self.status)
-                    return self.status
+    def submit_application(self, data: str, qty: int):
+        try:
+            apply_req = self.__request(
+                "POST",
+                f"{BaseURL_}/meroShare/applicantForm/share/apply",
+                idempotent=False,
+                data=data,
+            )
 
-                bank_specific_req = sess.get(
-                    f"{BaseURL_}/meroShare/bank/{bank_id}", verify=ca_file
-                )
+            self.status = apply_req.json()["message"]
 
-                bank_specific_response_json = bank_specific_req.json()[0]
-
-                data = json.dumps(
-                    {
-                        "accountBranchId": bank_specific_response_json.get(
-                            "accountBranchId"
-                        ),
-                        "accountNumber": bank_specific_response_json.get(
-                            "accountNumber"
-                        ),
-                        "accountTypeId": bank_specific_response_json.get(
-                            "accountTypeId"
-                        ),
-                        "appliedKitta": qty,
-                        "bankId": bank_id,
-                        "boid": self.__dmat[-8:],
-                        "companyShareId": share_id,
-                        "crnNumber": self.__crn,
-                        "customerId": bank_specific_response_json.get("id"),
-                        "demat": self.__dmat,
-                        "transactionPIN": self.__pin,
-                    }
-                )
+            logging.info(self.status)
 
-                apply_req = sess.post(
-                    f"{BaseURL_}/meroShare/applicantForm/share/apply",
-                    data=data,
-                    verify=ca_file,
+            if apply_req.status_code == 201:
+                self.applied = True
+                logging.info(
+                    f"Application Successful! for account: {self.__name}, {qty} Kitta"
                 )
 
-                self.status = apply_req.json()["message"]
-
-                logging.info(self.status)
-
-                if apply_req.status_code == 201:
-                    logging.info(
-                        f"Application Successful! for account: {self.__name}, {qty} Kitta"
-                    )
-
-                return self.status
+            return self.status
 
         except Exception as error:
             logging.info(error)
             self.status = f"Apply failed! - {error}"
             return self.status
 
-    @retry(stop=stop_after_attempt(10), wait=wait_fixed(3), reraise=True)
-    def get_application_status(self, scrip: str):
-        with self.__session as sess:
-            try:
-                data = json.dumps(
-                    {
-                        "filterFieldParams": [
-                            {
-                                "key": "companyShare.companyIssue.companyISIN.script",
-                                "alias": "Scrip",
-                            },
-                            {
-                                "key": "companyShare.companyIssue.companyISIN.company.name",
-                                "alias": "Company Name",
-                            },
-                        ],
-                        "page": 1,
-                        "size": 200,
-                        "searchRoleViewConstants": "VIEW_APPLICANT_FORM_COMPLETE",
-                        "filterDateParams": [
-                            {
-                                "key": "appliedDate",
-                                "condition": "",
-                                "alias": "",
-                                "value": "",
-                            },
-                            {
-                                "key": "appliedDate",
-                                "condition": "",
-                                "alias": "",
-                                "value": "",
-                            },
-                        ],
-                    }
-                )
-
-                try:
-                    recent_applied_req = sess.post(
-                        f"{BaseURL_}/meroShare/applicantForm/active/search/",
-                        data=data,
-                        verify=ca_file,
-                    )
-                except Exception as error:
-                    logging.error(error)
-                    raise error
-
-                target_issue = None
-
-                if recent_applied_req.status_code == 200:
-                    for issue in recent_applied_req.json()["object"]:
-                        if issue["scrip"] == scrip:
-                            target_issue = issue
-                else:
-                    self.status = "Application list request failed."
-                    logging.info(self.status)
-                    raise self.status
-
-                if not target_issue:
-                    self.status = "Script not found!"
-                    return self.status
-
-                try:
-                    details_req = sess.get(
-                        f"{BaseURL_}/meroShare/applicantForm/report/detail/{target_issue['applicantFormId']}",
-                        verify=ca_file,
-                    ).json()["statusName"]
-                    self.status = details_req
-                except Exception as error:
-                    logging.error(error)
-                    self.status = "Report rqeuest Failed"
-                    logging.info(self.status)
-
-                logging.info(f"Status: {self.status} for {self.__name}")
-                return details_req
+    def apply(self, share_id: str, qty: int):
+        data = self.prepare_application(share_id, qty)
+        if data is None:
+            return self.status
+        return self.submit_application(data, qty)
 
+    def find_applications(self):
+        # Every application of the account by scrip, from one paged search.
+        # None when the search failed, with the reason in self.status.
+        data = {
+            "filterFieldParams": [
+                {
+                    "key": "companyShare.companyIssue.companyISIN.script",
+                    "alias": "Scrip",
+                },
+                {
+                    "key": "companyShare.companyIssue.companyISIN.company.name",
+                    "alias": "Company Name",
+                },
+            ],
+            "searchRoleViewConstants": "VIEW_APPLICANT_FORM_COMPLETE",
+            "filterDateParams": [
+                {
+                    "key": "appliedDate",
+                    "condition": "",
+                    "alias": "",
+                    "value": "",
+                },
+                {
+                    "key": "appliedDate",
+                    "condition": "",
+                    "alias": "",
+                    "value": "",
+                },
+            ],
+        }
+
+        applications = {}
+        try:
+            for issue in self.__pages(
+                f"{BaseURL_}/meroShare/applicantForm/active/search/",
+                data,
+                "object",
+                "totalCount",
+                application_page_size,
+            ):
+                applications[issue["scrip"]] = issue
+        except Exception as error:
+            logging.info("Application list request failed.")
+            logging.error(error)
+            self.status = "Application status request failed."
+            logging.warning(f"Application status request failed! for {self.__name}")
+            return None
+        return applications
+
+    def get_application_statuses(self, scrips, applications=None):
+        # One search serves every scrip asked for (or pass in what
+        # find_applications() returned); the report details of the matching
+        # applications are then fetched side by side.
+        if applications is None:
+            applications = self.find_applications()
+            if applications is None:
+                return {scrip: self.status for scrip in scrips}
+
+        def get_detail(issue):
+            try:
+                return self.__request(
+                    "GET",
+                    f"{BaseURL_}/meroShare/applicantForm/report/detail/{issue['applicantFormId']}",
+                    hedge=True,
+                ).json()["statusName"]
             except Exception as error:
                 logging.error(error)
-                self.status = "Application status request failed."
-                logging.warning(
-                    f"Application status request failed! Retrying ({self.get_application_status.retry.statistics.get('attempt_number')})"
+                logging.info("Report rqeuest Failed")
+                return "Report rqeuest Failed"
+
+        statuses = {}
+        found = [scrip for scrip in scrips if scrip in applications]
+        for scrip in scrips:
+            if scrip not in applications:
+                statuses[scrip] = "Script not found!"
+
+        if found:
+            with ThreadPoolExecutor(
+                max_workers=min(detail_workers_, len(found))
+            ) as executor:
+                details = executor.map(
+                    get_detail, [applications[scrip] for scrip in found]
                 )
-                return 0
+                for scrip, status in zip(found, details):
+                    statuses[scrip] = status
+                    logging.info(f"Status: {status} for {self.__name} ({scrip})")
+
+        return statuses
+
+    def get_application_status(self, scrip: str):
+        self.status = self.get_application_statuses([scrip])[scrip]
+        if self.status in failed_statuses:
+            return 0
+        return self.status
@@ -0,0 +1,245 @@
+import bisect
+import itertools
+import json
+import os
+import re
+import threading
+import time
+from collections import Counter
+from urllib.parse import urlparse
+
+try:
+    import retry_policy
+except ImportError:
+    from files import retry_policy
+
+metrics_file = os.environ.get("MEROSHARE_METRICS")
+slowest_accounts_ = int(os.environ.get("MEROSHARE_METRICS_SLOWEST", 5))
+
+# Upper bounds of the latency histogram buckets, in seconds.
+buckets_ = (0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def route(url):
+    # Ids in the path (bank, application) would give every account its own
+    # endpoint, so they are folded into a placeholder.
+    path = urlparse(url).path
+    if "/meroShare" in path:
+        path = path[path.index("/meroShare") :]
+    return re.sub(r"/\d+(?=/|$)", "/{id}", path)
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, round(fraction * (len(values) - 1)))]
+
+
+class EndpointStats:
+    __slots__ = ("latencies", "buckets", "statuses", "bytes", "retries", "failures")
+
+    def __init__(self):
+        self.latencies = []
+        self.buckets = [0] * (len(buckets_) + 1)
+        self.statuses = Counter()
+        self.bytes = 0
+        self.retries = 0
+        self.failures = 0
+
+    def add(self, status, seconds, size, retry):
+        self.latencies.append(seconds)
+        self.buckets[bisect.bisect_left(buckets_, seconds)] += 1
+        self.statuses["error" if status is None else str(status)] += 1
+        self.bytes += size
+        self.retries += retry
+        self.failures += status is None or status >= 400
+
+
+class RunMetrics:
+    # An observer for throttle.observers_ that keeps per-endpoint and
+    # per-account timings for one operation.
+    def __init__(self, operation=None):
+        self.operation = operation
+        self.started = time.time()
+        self.finished = None
+        self.__lock = threading.Lock()
+        self.__endpoints = {}
+        self.__accounts = {}
+
+    def __call__(self, method, url, status, seconds, size, account):
+        retry = retry_policy.attempt_number() > 1
+        key = (method, route(url))
+        with self.__lock:
+            if key not in self.__endpoints:
+                self.__endpoints[key] = EndpointStats()
+            self.__endpoints[key].add(status, seconds, size, retry)
+
+            if account is not None:
+                totals = self.__accounts.setdefault(account, [0.0, 0, 0, 0])
+                totals[0] += seconds
+                totals[1] += 1
+                totals[2] += retry
+                totals[3] += status is None or status >= 400
+
+    def finish(self):
+        self.finished = time.time()
+
+    def summary(self):
+        with self.__lock:
+            endpoints = [
+                {
+                    "method": method,
+                    "endpoint": path,
+                    "requests": len(stats.latencies),
+                    "retries": stats.retries,
+                    "failures": stats.failures,
+                    "bytes": stats.bytes,
+                    "seconds": sum(stats.latencies),
+                    "p50": percentile(stats.latencies, 0.5),
+                    "p90": percentile(stats.latencies, 0.9),
+                    "p99": percentile(stats.latencies, 0.99),
+                    "max": max(stats.latencies),
+                    "statuses": dict(stats.statuses),
+                    "buckets": list(stats.buckets),
+                }
+                for (method, path), stats in sorted(self.__endpoints.items())
+            ]
+            accounts = sorted(
+                (
+                    {
+                        "account": str(account),
+                        "seconds": seconds,
+                        "requests": requests,
+                        "retries": retries,
+                        "failures": failures,
+                    }
+                    for account, (seconds, requests, retries, failures) in (
+                        self.__accounts.items()
+                    )
+                ),
+                key=lambda totals: totals["seconds"],
+                reverse=True,
+            )
+
+        finished = self.finished or time.time()
+        return {
+            "operation": self.operation,
+            "started": self.started,
+            "seconds": finished - self.started,
+            "requests": sum(endpoint["requests"] for endpoint in endpoints),
+            "retries": sum(endpoint["retries"] for endpoint in endpoints),
+            "failures": sum(endpoint["failures"] for endpoint in endpoints),
+            "bytes": sum(endpoint["bytes"] for endpoint in endpoints),
+            "request_seconds": sum(endpoint["seconds"] for endpoint in endpoints),
+            "accounts": len(accounts),
+            "endpoints": endpoints,
+            "slowest_accounts": accounts[:slowest_accounts_],
+        }
+
+    def log(self, logger):
+        summary = self.summary()
+        # Time spent outside HTTP calls is rate limiting, retry waits and our
+        # own work; comparing the two shows where a slow run went.
+        logger.info(
+            f"Run summary for {summary['operation']}: {summary['requests']} requests "
+            f"for {summary['accounts']} accounts in {summary['seconds']:.2f}s "
+            f"({summary['request_seconds']:.2f}s waiting on the server), "
+            f"{summary['retries']} retries, {summary['failures']} failed, "
+            f"{summary['bytes'] / 1024:.1f} KiB received"
+        )
+        for endpoint in summary["endpoints"]:
+            histogram = " ".join(
+                f"{label}:{count}"
+                for label, count in zip(
+                    [f"<={bound * 1000:g}ms" for bound in buckets_]
+                    + [f">{buckets_[-1] * 1000:g}ms"],
+                    endpoint["buckets"],
+                )
+                if count
+            )
+            statuses = ", ".join(
+                f"{status}: {count}" for status, count in endpoint["statuses"].items()
+            )
+            logger.info(
+                f"  {endpoint['method']} {endpoint['endpoint']}: "
+                f"{endpoint['requests']} requests, p50 {endpoint['p50'] * 1000:.0f}ms, "
+                f"p90 {endpoint['p90'] * 1000:.0f}ms, p99 {endpoint['p99'] * 1000:.0f}ms, "
+                f"max {endpoint['max'] * 1000:.0f}ms, {endpoint['retries']} retries "
+                f"[{statuses}] {histogram}"
+            )
+        if summary["slowest_accounts"]:
+            logger.info(
+                "  Slowest accounts: "
+                + ", ".join(
+                    f"{account['account']} ({account['seconds']:.2f}s, "
+                    f"{account['requests']} requests, {account['retries']} retries)"
+                    for account in summary["slowest_accounts"]
+                )
+            )
+
+    def to_openmetrics(self):
+        summary = self.summary()
+        operation = summary["operation"] or ""
+        lines = [
+            "# TYPE meroshare_request_duration_seconds histogram",
+            "# UNIT meroshare_request_duration_seconds seconds",
+            "# HELP meroshare_request_duration_seconds Time waiting on the server.",
+        ]
+        for endpoint in summary["endpoints"]:
+            labels = (
+                f'operation="{operation}",method="{endpoint["method"]}",'
+                f'endpoint="{endpoint["endpoint"]}"'
+            )
+            cumulative = itertools.accumulate(endpoint["buckets"])
+            for bound, count in zip([*buckets_, "+Inf"], cumulative):
+                lines.append(
+                    f'meroshare_request_duration_seconds_bucket{{{labels},le="{bound}"}} {count}'
+                )
+            lines += [
+                f"meroshare_request_duration_seconds_count{{{labels}}} {endpoint['requests']}",
+                f"meroshare_request_duration_seconds_sum{{{labels}}} {endpoint['seconds']}",
+            ]
+
+        for name, key, help_text in (
+            ("meroshare_requests", "statuses", "Requests by response status."),
+            ("meroshare_retries", "retries", "Requests that were retries."),
+            (
+                "meroshare_failures",
+                "failures",
+                "Requests that failed or got no response.",
+            ),
+            ("meroshare_response_bytes", "bytes", "Bytes received."),
+        ):
+            lines += [f"# TYPE {name} counter", f"# HELP {name} {help_text}"]
+            for endpoint in summary["endpoints"]:
+                labels = (
+                    f'operation="{operation}",method="{endpoint["method"]}",'
+                    f'endpoint="{endpoint["endpoint"]}"'
+                )
+                if key == "statuses":
+                    for status, count in endpoint["statuses"].items():
+                        lines.append(
+                            f'{name}_total{{{labels},status="{status}"}} {count}'
+                        )
+                else:
+                    lines.append(f"{name}_total{{{labels}}} {endpoint[key]}")
+
+        lines += [
+            "# TYPE meroshare_run_seconds gauge",
+            "# HELP meroshare_run_seconds Wall time of the operation.",
+            f'meroshare_run_seconds{{operation="{operation}"}} {summary["seconds"]}',
+            "# EOF",
+        ]
+        return "\n".join(lines) + "\n"
+
+    def export(self, path):
+        # "{operation}" in the name keeps one file per operation when several
+        # run in one go; otherwise the last one wins.
+        path = path.format(operation=self.operation or "run")
+        with open(path, "w") as metrics_file_:
+            if path.endswith(".json"):
+                json.dump(self.summary(), metrics_file_, indent=2)
+            else:
+                metrics_file_.write(self.to_openmetrics())
+        return path
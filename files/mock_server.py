@@ -0,0 +1,383 @@
+import argparse
+import base64
+import itertools
+import json
+import random
+import sys
+import threading
+import time
+import zlib
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# A local stand-in for the MeroShare backend, for trying the tool and
+# measuring it without touching the live CDSC servers. Point the tool at it
+# with MEROSHARE_BASE_URL=http://127.0.0.1:<port>/api
+
+capitals_ = [
+    {"code": "10900", "id": 1, "name": "Mock Capital Ltd."},
+    {"code": "11000", "id": 2, "name": "Mock Securities Ltd."},
+    {"code": "11200", "id": 3, "name": "Mock Investment Ltd."},
+]
+
+banks_ = [
+    {"id": 3, "name": "GLOBAL IME BANK LTD."},
+    {"id": 4, "name": "NABIL BANK LTD."},
+    {"id": 5, "name": "NEPAL INVESTMENT MEGA BANK LTD."},
+]
+
+issues_ = [
+    {
+        "companyShareId": 701,
+        "scrip": "ABC",
+        "companyName": "ABC Hydropower Ltd.",
+        "shareTypeName": "IPO",
+        "shareGroupName": "Ordinary Shares",
+        "subGroup": "For General Public",
+    },
+    {
+        "companyShareId": 702,
+        "scrip": "XYZ",
+        "companyName": "XYZ Laghubitta Ltd.",
+        "shareTypeName": "IPO",
+        "shareGroupName": "Ordinary Shares",
+        "subGroup": "For General Public",
+    },
+]
+
+
+class MockState:
+    def __init__(
+        self,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        error_rate: float = 0.0,
+        throttle_rate: float = 0.0,
+        retry_after: float = 0.1,
+        stall_rate: float = 0.0,
+        stall: float = 5.0,
+        shares: int = 25,
+        opens_in: float = 0.0,
+        token_ttl: float = 3600,
+        seed: int = None,
+    ):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.retry_after = retry_after
+        self.stall_rate = stall_rate
+        self.stall = stall
+        self.shares = shares
+        self.opens_at = time.time() + opens_in
+        self.token_ttl = token_ttl
+        self.__random = random.Random(seed)
+        self.__lock = threading.Lock()
+        self.__serial = itertools.count(1)
+        self.__tokens = {}
+        self.__applied = set()
+        self.calls = Counter()
+        self.faults = Counter()
+
+    def delay(self):
+        with self.__lock:
+            jitter = self.__random.uniform(0, self.jitter) if self.jitter else 0
+            # A few requests stuck far behind the rest, like on a congested day.
+            if self.stall_rate and self.__random.random() < self.stall_rate:
+                jitter += self.stall
+        if self.latency or jitter:
+            time.sleep(self.latency + jitter)
+
+    def fault(self, path):
+        with self.__lock:
+            self.calls[path] += 1
+            draw = self.__random.random()
+            if draw < self.throttle_rate:
+                self.faults[429] += 1
+                return 429
+            if draw < self.throttle_rate + self.error_rate:
+                self.faults[503] += 1
+                return 503
+        return None
+
+    def is_open(self):
+        return time.time() >= self.opens_at
+
+    def login(self, username):
+        # Shaped like a JWT so the tool's token cache can read the expiry.
+        claims = {"sub": username, "exp": time.time() + self.token_ttl}
+        payload = base64.urlsafe_b64encode(json.dumps(claims).encode())
+        with self.__lock:
+            token = f"mock.{payload.decode().rstrip('=')}.{next(self.__serial)}"
+            self.__tokens[token] = username
+        return token
+
+    def user(self, token):
+        with self.__lock:
+            return self.__tokens.get(token)
+
+    def apply(self, username, share_id):
+        with self.__lock:
+            if (username, share_id) in self.__applied:
+                return False
+            self.__applied.add((username, share_id))
+            return True
+
+    def applied(self, username, share_id):
+        with self.__lock:
+            return (username, share_id) in self.__applied
+
+    def stats(self):
+        with self.__lock:
+            return {
+                "requests": sum(self.calls.values()),
+                "calls": dict(self.calls),
+                "faults": {str(code): count for code, count in self.faults.items()},
+            }
+
+    def reset(self):
+        with self.__lock:
+            self.calls.clear()
+            self.faults.clear()
+            self.__tokens.clear()
+            self.__applied.clear()
+
+
+def allotment(username, scrip):
+    return (
+        "Alloted"
+        if zlib.crc32(f"{username}:{scrip}".encode()) % 3 == 0
+        else "Not Alloted"
+    )
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out in separate writes; with Nagle on, every
+    # keep-alive response would wait for the client's delayed ACK.
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        self.route("GET")
+
+    def do_POST(self):
+        self.route("POST")
+
+    def send(self, status, body, headers=None):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def read_body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        data = self.rfile.read(length) if length else b""
+        try:
+            return json.loads(data or b"{}")
+        except ValueError:
+            return {}
+
+    def route(self, method):
+        state = self.server.state
+        path = self.path.split("?", 1)[0]
+        path = path[path.index("/meroShare") :] if "/meroShare" in path else path
+        body = self.read_body() if method == "POST" else {}
+
+        if path.endswith("/__stats"):
+            return self.send(200, state.stats())
+        if path.endswith("/__reset"):
+            state.reset()
+            return self.send(200, {"message": "reset"})
+
+        state.delay()
+        status = state.fault(path)
+        if status == 429:
+            return self.send(
+                429,
+                {"message": "Too many requests"},
+                {"Retry-After": f"{state.retry_after:g}"},
+            )
+        if status:
+            return self.send(status, {"message": "Service unavailable"})
+
+        if path == "/meroShare/capital/":
+            return self.send(200, capitals_)
+
+        if path == "/meroShare/auth/":
+            if str(body.get("password", "")).startswith("bad"):
+                return self.send(401, {"message": "Invalid username or password."})
+            token = state.login(str(body.get("username")))
+            return self.send(
+                200, {"message": "Log in successful."}, {"Authorization": token}
+            )
+
+        username = state.user(self.headers.get("Authorization"))
+        if username is None:
+            return self.send(401, {"message": "Unauthorized"})
+
+        if path == "/meroShareView/myShare/":
+            items = [
+                {
+                    "script": f"S{number:03d}",
+                    "currentBalance": 10 + number,
+                    "freeBalance": 10 + number,
+                }
+                for number in range(state.shares)
+            ]
+            return self.send(
+                200, page(body, items, "meroShareDematShare", "totalItems")
+            )
+
+        if path == "/meroShare/companyShare/applicableIssue/":
+            items = [
+                {
+                    **issue,
+                    "action": (
+                        "edit"
+                        if state.applied(username, issue["companyShareId"])
+                        else None
+                    ),
+                }
+                for issue in (issues_ if state.is_open() else [])
+            ]
+            return self.send(200, page(body, items, "object", "totalCount"))
+
+        if path == "/meroShare/bank/":
+            return self.send(200, banks_)
+
+        if path.startswith("/meroShare/bank/"):
+            return self.send(
+                200,
+                [
+                    {
+                        "accountBranchId": 11,
+                        "accountNumber": f"0{username}",
+                        "accountTypeId": 1,
+                        "id": 21,
+                    }
+                ],
+            )
+
+        if path == "/meroShare/applicantForm/share/apply":
+            if not state.is_open():
+                return self.send(400, {"message": "Issue is not open yet."})
+            if state.apply(username, body.get("companyShareId")):
+                return self.send(
+                    201, {"message": "Share has been applied successfully."}
+                )
+            return self.send(409, {"message": "Share has already been applied."})
+
+        if path == "/meroShare/applicantForm/active/search/":
+            items = [
+                {"scrip": issue["scrip"], "applicantFormId": issue["companyShareId"]}
+                for issue in issues_
+            ]
+            return self.send(200, page(body, items, "object", "totalCount"))
+
+        if path.startswith("/meroShare/applicantForm/report/detail/"):
+            form_id = int(path.rsplit("/", 1)[-1])
+            scrip = next(
+                (
+                    issue["scrip"]
+                    for issue in issues_
+                    if issue["companyShareId"] == form_id
+                ),
+                None,
+            )
+            if scrip is None:
+                return self.send(404, {"message": "Application not found"})
+            return self.send(200, {"statusName": allotment(username, scrip)})
+
+        self.send(404, {"message": "Not found"})
+
+
+def page(body, items, key, total_key):
+    number, size = int(body.get("page") or 1), int(body.get("size") or len(items) or 1)
+    return {key: items[(number - 1) * size : number * size], total_key: len(items)}
+
+
+def start(host="127.0.0.1", port=0, state=None):
+    server = ThreadingHTTPServer((host, port), MockHandler)
+    server.daemon_threads = True
+    server.state = state or MockState()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def base_url(server):
+    host, port = server.server_address[:2]
+    return f"http://{host}:{port}/api"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Serve a local stand-in for the MeroShare backend."
+    )
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000, help="0 picks a free port")
+    parser.add_argument(
+        "--latency", type=float, default=0.0, help="seconds added to every response"
+    )
+    parser.add_argument(
+        "--jitter", type=float, default=0.0, help="up to this many extra seconds"
+    )
+    parser.add_argument(
+        "--error-rate", type=float, default=0.0, help="share of requests failing 503"
+    )
+    parser.add_argument(
+        "--throttle-rate",
+        type=float,
+        default=0.0,
+        help="share of requests answered 429",
+    )
+    parser.add_argument("--retry-after", type=float, default=0.1)
+    parser.add_argument(
+        "--stall-rate",
+        type=float,
+        default=0.0,
+        help="share of requests held for --stall seconds",
+    )
+    parser.add_argument("--stall", type=float, default=5.0)
+    parser.add_argument("--shares", type=int, default=25, help="shares per account")
+    parser.add_argument(
+        "--opens-in",
+        type=float,
+        default=0.0,
+        help="list the issues only this many seconds after starting",
+    )
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    state = MockState(
+        latency=args.latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        throttle_rate=args.throttle_rate,
+        retry_after=args.retry_after,
+        stall_rate=args.stall_rate,
+        stall=args.stall,
+        shares=args.shares,
+        opens_in=args.opens_in,
+        seed=args.seed,
+    )
+    server = start(args.host, args.port, state)
+    # The first line tells scripts starting the server where to find it.
+    print(base_url(server), flush=True)
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.shutdown()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
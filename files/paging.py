@@ -0,0 +1,30 @@
+from concurrent.futures import ThreadPoolExecutor
+
+
+def paginate(fetch, size: int, prefetch: bool = False):
+    # `fetch(page, size)` returns the items of one page and the total count if
+    # the server sent one. Pages are yielded item by item until a short page
+    # (or the total) says there are no more; with `prefetch` the next page is
+    # already being requested while the current one is consumed.
+    executor = ThreadPoolExecutor(max_workers=1) if prefetch else None
+    try:
+        page, seen = 1, 0
+        items, total = fetch(page, size)
+        while True:
+            seen += len(items)
+            more = len(items) >= size and (total is None or seen < total)
+
+            pending = None
+            if more and executor:
+                pending = executor.submit(fetch, page + 1, size)
+
+            yield from items
+
+            if not more:
+                return
+
+            page += 1
+            items, total = pending.result() if pending else fetch(page, size)
+    finally:
+        if executor:
+            executor.shutdown(wait=False, cancel_futures=True)
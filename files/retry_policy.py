@@ -0,0 +1,162 @@
+import contextvars
+import itertools
+import logging
+import os
+import threading
+import time
+
+attempts_ = int(os.environ.get("MEROSHARE_RETRY_ATTEMPTS", 4))
+budget_limit_ = int(os.environ.get("MEROSHARE_RETRY_BUDGET", 200))
+max_wait_ = float(os.environ.get("MEROSHARE_RETRY_MAX_WAIT", 30))
+
+retry_statuses = {429, 500, 502, 503, 504}
+# Statuses that mean the server never processed the request, so even a
+# non-idempotent POST (like apply) can safely be sent again.
+unprocessed_statuses = {429, 503}
+
+
+class RetryableError(Exception):
+    def __init__(self, response):
+        super().__init__(f"Server responded with status {response.status_code}")
+        self.response = response
+        self.retry_after = parse_retry_after(response.headers.get("Retry-After"))
+
+
+def parse_retry_after(value):
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    import email.utils
+
+    try:
+        return max(
+            0.0, email.utils.parsedate_to_datetime(value).timestamp() - time.time()
+        )
+    except (TypeError, ValueError):
+        return None
+
+
+class RetryBudget:
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.used = 0
+        self.__lock = threading.Lock()
+
+    def spend(self):
+        with self.__lock:
+            if self.used >= self.limit:
+                return False
+            self.used += 1
+            return True
+
+    def reset(self):
+        with self.__lock:
+            self.used = 0
+
+
+budget_ = RetryBudget(budget_limit_)
+
+# The attempt being sent, so request observers can tell retries from first
+# tries. A context variable, so it follows requests handed to other threads.
+attempt_ = contextvars.ContextVar("attempt", default=1)
+
+
+def attempt_number():
+    return attempt_.get()
+
+
+def never_sent(error):
+    # True only when the connection itself couldn't be made, so the server
+    # can't have seen the request. A dropped or reset connection may come
+    # after the server has processed it.
+    import requests
+    from urllib3.exceptions import NewConnectionError
+
+    if isinstance(error, requests.ConnectTimeout):
+        return True
+    seen, pending = set(), [error]
+    while pending:
+        cause = pending.pop()
+        if cause is None or id(cause) in seen:
+            continue
+        seen.add(id(cause))
+        if isinstance(cause, NewConnectionError):
+            return True
+        if isinstance(cause, BaseException):
+            pending += [
+                getattr(cause, "reason", None),
+                cause.__cause__,
+                cause.__context__,
+                *cause.args,
+            ]
+    return False
+
+
+def is_retryable(error, idempotent=True):
+    import requests
+
+    if isinstance(error, RetryableError):
+        return idempotent or error.response.status_code in unprocessed_statuses
+    if isinstance(error, (requests.ConnectionError, requests.Timeout)):
+        return idempotent or never_sent(error)
+    return False
+
+
+def wait(retry_state):
+    from tenacity import wait_exponential_jitter
+
+    error = retry_state.outcome.exception()
+    retry_after = getattr(error, "retry_after", None)
+    if retry_after is not None:
+        return min(retry_after, max_wait_)
+    return wait_exponential_jitter(initial=1, max=max_wait_, jitter=1)(retry_state)
+
+
+def stop(retry_state):
+    from tenacity import stop_after_attempt
+
+    if stop_after_attempt(attempts_)(retry_state):
+        return True
+    if not budget_.spend():
+        logging.warning("Retry budget for this batch used up, not retrying")
+        return True
+    return False
+
+
+def before_sleep(retry_state):
+    logging.info(
+        f"Retrying in {retry_state.next_action.sleep:.1f}s "
+        f"(attempt {retry_state.attempt_number}): {retry_state.outcome.exception()}"
+    )
+
+
+def call(send, *args, idempotent: bool = True, **kwargs):
+    from tenacity import Retrying, retry_if_exception
+
+    attempts = itertools.count(1)
+
+    def attempt():
+        token = attempt_.set(next(attempts))
+        try:
+            response = send(*args, **kwargs)
+        finally:
+            attempt_.reset(token)
+        if response.status_code in retry_statuses:
+            raise RetryableError(response)
+        return response
+
+    try:
+        return Retrying(
+            retry=retry_if_exception(lambda error: is_retryable(error, idempotent)),
+            wait=wait,
+            stop=stop,
+            before_sleep=before_sleep,
+            reraise=True,
+        )(attempt)
+    except RetryableError as error:
+        # Hand the last response back to the caller, which already knows how
+        # to report a failed status.
+        return error.response
@@ -0,0 +1,97 @@
+import os
+import threading
+import time
+from functools import lru_cache
+
+try:
+    import engine
+except ImportError:
+    from files import engine
+
+pool_size_ = int(os.environ.get("MEROSHARE_POOL_SIZE", max(10, engine.workers_)))
+
+stats_lock = threading.Lock()
+stats_ = {"requests": 0, "hits": 0, "misses": 0, "handshake_seconds": 0.0}
+
+
+@lru_cache(maxsize=None)
+def adapter_class():
+    import ssl
+
+    from requests.adapters import HTTPAdapter
+    from urllib3.connection import HTTPSConnection
+    from urllib3.connectionpool import HTTPSConnectionPool
+
+    class TimedHTTPSConnection(HTTPSConnection):
+        def connect(self):
+            start = time.perf_counter()
+            try:
+                return super().connect()
+            finally:
+                with stats_lock:
+                    stats_["misses"] += 1
+                    stats_["handshake_seconds"] += time.perf_counter() - start
+
+    class CountingHTTPSConnectionPool(HTTPSConnectionPool):
+        ConnectionCls = TimedHTTPSConnection
+
+        def urlopen(self, *args, **kwargs):
+            with stats_lock:
+                stats_["requests"] += 1
+            return super().urlopen(*args, **kwargs)
+
+    class PooledAdapter(HTTPAdapter):
+        def __init__(self, ca_file, pool_size):
+            self.__ssl_context = ssl.create_default_context(cafile=ca_file)
+            super().__init__(pool_connections=4, pool_maxsize=pool_size)
+
+        def init_poolmanager(self, *args, **kwargs):
+            kwargs["ssl_context"] = self.__ssl_context
+            super().init_poolmanager(*args, **kwargs)
+            self.poolmanager.pool_classes_by_scheme = {
+                **self.poolmanager.pool_classes_by_scheme,
+                "https": CountingHTTPSConnectionPool,
+            }
+
+        def close(self):
+            # Shared by every MeroShare session, so a single session closing must
+            # not tear down the pooled connections of the others.
+            pass
+
+    return PooledAdapter
+
+
+adapter_lock = threading.Lock()
+adapter_ = None
+
+
+def get_adapter(ca_file):
+    global adapter_
+    with adapter_lock:
+        if adapter_ is None:
+            adapter_ = adapter_class()(ca_file, pool_size_)
+        return adapter_
+
+
+def mount(session, ca_file):
+    session.mount("https://", get_adapter(ca_file))
+    return session
+
+
+def get_stats():
+    with stats_lock:
+        stats = dict(stats_)
+
+    stats["hits"] = max(0, stats["requests"] - stats["misses"])
+    handshake = stats["handshake_seconds"] / stats["misses"] if stats["misses"] else 0
+    stats["saved_seconds"] = stats["hits"] * handshake
+    return stats
+
+
+def log_stats(logger):
+    stats = get_stats()
+    logger.info(
+        f"Connection pool: {stats['requests']} requests, {stats['hits']} reused, "
+        f"{stats['misses']} new ({stats['handshake_seconds']:.2f}s handshaking, "
+        f"~{stats['saved_seconds']:.2f}s saved)"
+    )
@@ -0,0 +1,136 @@
+import logging
+import os
+import re
+import sys
+import zlib
+
+try:
+    import sinks
+except ImportError:
+    from files import sinks
+
+# Shard outputs are named "<report>.shard-<k>-of-<n>.jsonl", which is all the
+# merge needs to know which report they belong to and whether one is missing.
+part_pattern = re.compile(r"^(?P<name>.*)\.shard-(?P<shard>\d+)-of-(?P<shards>\d+)$")
+part_format = "jsonl"
+
+demat_columns = ("Demat", "DMAT No")
+
+
+def parse_shard(value):
+    shard, _, shards = str(value).partition("/")
+    shard, shards = int(shard), int(shards)
+    if not 1 <= shard <= shards:
+        raise ValueError(f"shard must be between 1 and {shards}")
+    return shard, shards
+
+
+def select(accounts, shard, shards, by="hash"):
+    # By hash of the demat an account stays in the same shard when rows are
+    # added or removed; by range each shard is a block of consecutive rows.
+    if by == "range":
+        return [
+            account
+            for position, account in enumerate(accounts)
+            if position * shards // len(accounts) == shard - 1
+        ]
+    return [
+        account
+        for account in accounts
+        if zlib.crc32(str(account.demat).encode()) % shards == shard - 1
+    ]
+
+
+def part_name(name, shard, shards):
+    return f"{name}.shard-{shard}-of-{shards}"
+
+
+def part_paths(name, shards):
+    return [
+        part_name(name, shard, shards) + sinks.sinks_[part_format].extension
+        for shard in range(1, shards + 1)
+    ]
+
+
+def merge(paths, accounts, name=None, output_format="xlsx"):
+    # Puts the rows of every shard back in the order of the "List" sheet.
+    parts = {}
+    for path in paths:
+        stem = path[: -len(sinks.sinks_[part_format].extension)]
+        match = part_pattern.match(stem)
+        if not path.endswith(sinks.sinks_[part_format].extension) or not match:
+            raise ValueError(f"{path} isn't a shard output")
+        parts[path] = (match["name"], int(match["shard"]), int(match["shards"]))
+
+    names = {part[0] for part in parts.values()}
+    counts = {part[2] for part in parts.values()}
+    if len(names) != 1 or len(counts) != 1:
+        raise ValueError("Shard outputs belong to different reports or shard counts")
+
+    shards = counts.pop()
+    missing = set(range(1, shards + 1)) - {part[1] for part in parts.values()}
+    if missing:
+        raise ValueError(
+            f"Missing shards: {', '.join(str(shard) for shard in sorted(missing))}"
+        )
+
+    order = {}
+    for position, account in enumerate(accounts):
+        order.setdefault(str(account.demat), position)
+
+    columns, keyed = None, []
+    for path in sorted(parts, key=lambda path: parts[path][1]):
+        part_columns, rows = sinks.read_json_lines(path)
+        if columns is None:
+            columns = part_columns
+            demat = next(
+                (
+                    columns.index(column)
+                    for column in demat_columns
+                    if column in columns
+                ),
+                None,
+            )
+        elif part_columns != columns:
+            raise ValueError(f"{path} has different columns")
+
+        for sequence, row in enumerate(rows):
+            position = (
+                order.get(str(row[demat]), len(order)) if demat is not None else 0
+            )
+            keyed.append((position, parts[path][1], sequence, row))
+
+    unknown = sum(1 for position, *rest in keyed if position == len(order))
+    if unknown:
+        logging.warning(f"{unknown} rows don't match any client in the list, kept last")
+
+    keyed.sort(key=lambda item: item[:3])
+    sink = sinks.open_sink(output_format, name or names.pop(), columns)
+    try:
+        for *key, row in keyed:
+            sink.write(row)
+    finally:
+        sink.close()
+    return len(keyed)
+
+
+def run_local(argv, processes):
+    # One process per shard, each running the same command line on its own
+    # part of the list.
+    import subprocess
+
+    children = [
+        subprocess.Popen(
+            [
+                sys.executable,
+                "-m",
+                "files.cli",
+                "--shard",
+                f"{shard}/{processes}",
+                *argv,
+            ],
+            cwd=os.getcwd(),
+        )
+        for shard in range(1, processes + 1)
+    ]
+    return [child.wait() for child in children]
@@ -0,0 +1,136 @@
+import csv
+import json
+import logging
+import os
+
+# Rows between flushes of CSV, JSON Lines and Parquet outputs; 0 only writes
+# them out on close. Excel files can't be flushed part way.
+flush_every_ = max(0, int(os.environ.get("MEROSHARE_FLUSH_EVERY", 50)))
+
+
+class ExcelSink:
+    extension = ".xlsx"
+
+    def __init__(self, path, columns):
+        from openpyxl import Workbook
+
+        # Write-only workbooks stream rows to a temporary file instead of
+        # holding every cell in memory; the .xlsx itself is built on close,
+        # so a crash loses the whole file.
+        self.path = path
+        self.__book = Workbook(write_only=True)
+        self.__sheet = self.__book.create_sheet()
+        self.__sheet.append(list(columns))
+
+    def write(self, row):
+        self.__sheet.append(list(row))
+
+    def close(self):
+        self.__book.save(self.path)
+
+
+class CSVSink:
+    extension = ".csv"
+
+    def __init__(self, path, columns, flush_every: int = flush_every_):
+        self.path = path
+        self.flush_every = flush_every
+        self.__count = 0
+        self.__file = open(path, "w", newline="", encoding="utf-8-sig")
+        self.__writer = csv.writer(self.__file)
+        self.__writer.writerow(columns)
+
+    def write(self, row):
+        self.__writer.writerow(row)
+        self.__count += 1
+        if self.flush_every and self.__count % self.flush_every == 0:
+            self.__file.flush()
+
+    def close(self):
+        self.__file.close()
+
+
+class JSONLinesSink:
+    extension = ".jsonl"
+
+    # The first line holds the column names, then one JSON list per row.
+    # Keeps numbers as numbers, which is what shard outputs are merged from.
+    def __init__(self, path, columns, flush_every: int = flush_every_):
+        self.path = path
+        self.flush_every = flush_every
+        self.__count = 0
+        self.__file = open(path, "w", encoding="utf-8")
+        self.__file.write(json.dumps({"columns": list(columns)}) + "\n")
+
+    def write(self, row):
+        self.__file.write(json.dumps(list(row), default=str) + "\n")
+        self.__count += 1
+        if self.flush_every and self.__count % self.flush_every == 0:
+            self.__file.flush()
+
+    def close(self):
+        self.__file.close()
+
+
+def read_json_lines(path):
+    with open(path, encoding="utf-8") as lines:
+        columns = json.loads(next(lines))["columns"]
+        return columns, [json.loads(line) for line in lines if line.strip()]
+
+
+class ParquetSink:
+    extension = ".parquet"
+
+    def __init__(self, path, columns, flush_every: int = flush_every_):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise RuntimeError("Install 'pyarrow' to export Parquet files")
+
+        # Result columns mix statuses and numbers, so everything is stored as
+        # text; each flush becomes one row group that survives a crash.
+        self.path = path
+        self.columns = list(columns)
+        self.flush_every = flush_every
+        self.__pa = pa
+        self.__schema = pa.schema([(column, pa.string()) for column in self.columns])
+        self.__writer = pq.ParquetWriter(path, self.__schema)
+        self.__rows = []
+
+    def write(self, row):
+        self.__rows.append([None if value is None else str(value) for value in row])
+        if self.flush_every and len(self.__rows) >= self.flush_every:
+            self.flush()
+
+    def flush(self):
+        if not self.__rows:
+            return
+        table = self.__pa.Table.from_arrays(
+            [
+                self.__pa.array(values, self.__pa.string())
+                for values in zip(*self.__rows)
+            ],
+            schema=self.__schema,
+        )
+        self.__writer.write_table(table)
+        self.__rows = []
+
+    def close(self):
+        self.flush()
+        self.__writer.close()
+
+
+sinks_ = {
+    "xlsx": ExcelSink,
+    "csv": CSVSink,
+    "parquet": ParquetSink,
+    "jsonl": JSONLinesSink,
+}
+
+
+def open_sink(output_format, name, columns):
+    sink_class = sinks_[output_format]
+    path = name + sink_class.extension
+    logging.info(f"Writing results to {path}")
+    return sink_class(path, columns)
@@ -0,0 +1,231 @@
+import datetime
+import logging
+import os
+import sqlite3
+import threading
+
+snapshot_file = os.environ.get("MEROSHARE_SNAPSHOTS", "files/snapshots.sqlite3")
+
+diff_columns = [
+    "Client ID",
+    "Name",
+    "DMAT No",
+    "Script",
+    "Change",
+    "Previous Balance",
+    "Current Balance",
+    "Previous Free",
+    "Free Balance",
+    "Difference",
+]
+
+
+def today():
+    return datetime.date.today().isoformat()
+
+
+class SnapshotStore:
+    # One row per (demat, scrip, date) with the balances of that day's share
+    # list; a second run on the same day replaces the account's rows.
+    def __init__(self, path):
+        self.path = path
+        self.__lock = threading.Lock()
+        self.__db = None
+
+    def __connect(self):
+        if self.__db is None:
+            self.__db = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            self.__db.executescript("""
+                CREATE TABLE IF NOT EXISTS holdings (
+                    demat TEXT NOT NULL,
+                    scrip TEXT NOT NULL,
+                    taken TEXT NOT NULL,
+                    client_id TEXT,
+                    name TEXT,
+                    current REAL NOT NULL,
+                    free REAL NOT NULL,
+                    PRIMARY KEY (demat, scrip, taken)
+                ) WITHOUT ROWID;
+                CREATE INDEX IF NOT EXISTS holdings_taken ON holdings (taken);
+                -- Accounts whose list was read that day, so an account that
+                -- failed to log in isn't mistaken for one that sold everything.
+                CREATE TABLE IF NOT EXISTS snapshots (
+                    taken TEXT NOT NULL,
+                    demat TEXT NOT NULL,
+                    PRIMARY KEY (taken, demat)
+                ) WITHOUT ROWID;
+                """)
+        return self.__db
+
+    def record(self, demat, rows, taken=None):
+        # `rows` as returned by MeroShare.get_share_rows().
+        taken = taken or today()
+        with self.__lock:
+            db = self.__connect()
+            with db:
+                db.execute(
+                    "DELETE FROM holdings WHERE demat = ? AND taken = ?",
+                    (str(demat), taken),
+                )
+                db.executemany(
+                    "INSERT OR REPLACE INTO holdings VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    [
+                        (
+                            str(demat),
+                            str(scrip),
+                            taken,
+                            None if client_id is None else str(client_id),
+                            name,
+                            float(current or 0),
+                            float(free or 0),
+                        )
+                        for client_id, name, demat_, scrip, current, free in rows
+                    ],
+                )
+                db.execute(
+                    "INSERT OR REPLACE INTO snapshots VALUES (?, ?)",
+                    (taken, str(demat)),
+                )
+
+    def dates(self):
+        with self.__lock:
+            return [
+                taken
+                for taken, in self.__connect().execute(
+                    "SELECT DISTINCT taken FROM snapshots ORDER BY taken"
+                )
+            ]
+
+    def previous(self, taken):
+        # Each account's own latest snapshot before `taken`, since accounts
+        # aren't all read on the same days.
+        with self.__lock:
+            return dict(
+                self.__connect().execute(
+                    "SELECT demat, MAX(taken) FROM snapshots WHERE taken < ? "
+                    "GROUP BY demat",
+                    (str(taken),),
+                )
+            )
+
+    def load(self, taken):
+        with self.__lock:
+            db = self.__connect()
+            demats = {
+                demat
+                for demat, in db.execute(
+                    "SELECT demat FROM snapshots WHERE taken = ?", (taken,)
+                )
+            }
+            rows = db.execute(
+                "SELECT demat, scrip, client_id, name, current, free "
+                "FROM holdings WHERE taken = ?",
+                (taken,),
+            ).fetchall()
+        return demats, rows
+
+    def load_previous(self, taken):
+        # Like load(), with every account's rows from its previous() date.
+        with self.__lock:
+            db = self.__connect()
+            latest = (
+                "SELECT demat, MAX(taken) AS taken FROM snapshots "
+                "WHERE taken < ? GROUP BY demat"
+            )
+            demats = {demat for demat, _ in db.execute(latest, (str(taken),))}
+            rows = db.execute(
+                f"WITH latest AS ({latest}) "
+                "SELECT demat, scrip, client_id, name, current, free "
+                "FROM holdings JOIN latest USING (demat, taken)",
+                (str(taken),),
+            ).fetchall()
+        return demats, rows
+
+    def close(self):
+        with self.__lock:
+            if self.__db is not None:
+                self.__db.close()
+                self.__db = None
+
+
+snapshots_ = SnapshotStore(snapshot_file)
+
+
+def diff(before, after, demats=None, store=snapshots_):
+    # Compares two snapshots and returns only the rows that differ: new and
+    # removed scrips, changed balances, and scrips whose free balance isn't
+    # the current balance. Only accounts read on both days are compared;
+    # with no `before`, each account against its own previous snapshot.
+    import numpy as np
+    import pandas as pd
+
+    columns = ["demat", "scrip", "client_id", "name", "current", "free"]
+    if before is None:
+        before_demats, before_rows = store.load_previous(after)
+    else:
+        before_demats, before_rows = store.load(before)
+    after_demats, after_rows = store.load(after)
+    stored = before_demats | after_demats
+    if demats is not None:
+        stored &= {str(demat) for demat in demats}
+    compared = stored & before_demats & after_demats
+    skipped = len(stored - compared)
+    if skipped:
+        logging.info(f"{skipped} accounts are only in one of the snapshots, skipped")
+
+    old = pd.DataFrame.from_records(before_rows, columns=columns)
+    new = pd.DataFrame.from_records(after_rows, columns=columns)
+    old = old[old["demat"].isin(compared)]
+    new = new[new["demat"].isin(compared)]
+
+    merged = old.merge(
+        new,
+        on=["demat", "scrip"],
+        how="outer",
+        suffixes=("_old", "_new"),
+        indicator=True,
+    )
+    added = merged["_merge"].eq("right_only")
+    removed = merged["_merge"].eq("left_only")
+    changed = (
+        ~added
+        & ~removed
+        & (
+            merged["current_old"].ne(merged["current_new"])
+            | merged["free_old"].ne(merged["free_new"])
+        )
+    )
+    not_free = ~removed & merged["current_new"].ne(merged["free_new"])
+
+    merged["change"] = np.select(
+        [added, removed, changed, not_free],
+        ["New", "Removed", "Changed", "Free Differs"],
+        default="",
+    )
+    merged = merged[merged["change"] != ""].copy()
+    merged["client_id"] = merged["client_id_new"].fillna(merged["client_id_old"])
+    merged["name"] = merged["name_new"].fillna(merged["name_old"])
+    merged["difference"] = merged["current_new"].fillna(0) - merged[
+        "current_old"
+    ].fillna(0)
+    # In the order of the accounts asked for, like every other report.
+    order = {str(demat): position for position, demat in enumerate(demats or ())}
+    merged["position"] = merged["demat"].map(order).fillna(len(order))
+    merged = merged.sort_values(["position", "demat", "scrip"])
+
+    frame = merged[
+        [
+            "client_id",
+            "name",
+            "demat",
+            "scrip",
+            "change",
+            "current_old",
+            "current_new",
+            "free_old",
+            "free_new",
+            "difference",
+        ]
+    ]
+    frame = frame.astype(object).where(frame.notna(), None)
+    return [list(row) for row in frame.itertuples(index=False, name=None)]
@@ -0,0 +1,244 @@
+import logging
+import os
+import threading
+import time
+from collections import deque
+from functools import lru_cache
+from urllib.parse import urlparse
+
+rate_ = float(os.environ.get("MEROSHARE_RATE", 10))
+
+# Requests per second for each kind of endpoint, on top of the per-host limit.
+endpoint_rates_ = {
+    "auth": float(os.environ.get("MEROSHARE_RATE_AUTH", 4)),
+    "apply": float(os.environ.get("MEROSHARE_RATE_APPLY", 2)),
+    "search": float(os.environ.get("MEROSHARE_RATE_SEARCH", 6)),
+    "other": float(os.environ.get("MEROSHARE_RATE_OTHER", 0)),
+}
+
+# (connect, read) timeouts in seconds for each kind of endpoint, set with
+# MEROSHARE_CONNECT_TIMEOUT_<KIND> and MEROSHARE_READ_TIMEOUT_<KIND>. A read
+# timeout on an apply is never retried, so it gets the most time.
+connect_timeout_ = float(os.environ.get("MEROSHARE_CONNECT_TIMEOUT", 5))
+
+
+def timeout_setting(kind, read):
+    return (
+        float(os.environ.get(f"MEROSHARE_CONNECT_TIMEOUT_{kind}", connect_timeout_)),
+        float(os.environ.get(f"MEROSHARE_READ_TIMEOUT_{kind}", read)),
+    )
+
+
+timeouts_ = {
+    "auth": timeout_setting("AUTH", 20),
+    "apply": timeout_setting("APPLY", 60),
+    "search": timeout_setting("SEARCH", 30),
+    "other": timeout_setting("OTHER", 30),
+}
+
+breaker_window_ = int(os.environ.get("MEROSHARE_BREAKER_WINDOW", 20))
+breaker_threshold_ = float(os.environ.get("MEROSHARE_BREAKER_THRESHOLD", 0.5))
+breaker_cooldown_ = float(os.environ.get("MEROSHARE_BREAKER_COOLDOWN", 30))
+
+
+class RateLimiter:
+    def __init__(self, rate: float, burst: float = None):
+        self.rate = rate
+        self.burst = burst or max(1.0, rate)
+        self.__lock = threading.Lock()
+        self.__buckets = {}
+
+    def set_rate(self, rate: float, burst: float = None):
+        # The burst follows the rate, so lowering the rate lowers it too.
+        with self.__lock:
+            self.rate = rate
+            self.burst = burst or max(1.0, rate)
+            self.__buckets.clear()
+
+    def __take(self, key):
+        # Takes a token if there is one; otherwise says how long until there is.
+        with self.__lock:
+            now = time.monotonic()
+            tokens, last = self.__buckets.get(key, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - last) * self.rate)
+
+            if tokens >= 1:
+                self.__buckets[key] = (tokens - 1, now)
+                return 0
+
+            self.__buckets[key] = (tokens, now)
+            return (1 - tokens) / self.rate
+
+    def wait(self, key):
+        if not self.rate or self.rate <= 0:
+            return
+
+        while True:
+            delay = self.__take(key)
+            if not delay:
+                return
+            time.sleep(delay)
+
+    def try_wait(self, key):
+        return not self.rate or self.rate <= 0 or not self.__take(key)
+
+
+class CircuitBreaker:
+    # Closed: requests flow. Open: the error rate over the last `window`
+    # requests passed `threshold`, so everyone waits out the cooldown.
+    # Half-open: one probe request at a time decides whether to close again.
+    # before() hands the probe a token, and only a result recorded with that
+    # token counts, not one from a request let through before the breaker
+    # opened.
+    def __init__(self, window: int, threshold: float, cooldown: float):
+        self.window = window
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.state = "closed"
+        self.__lock = threading.Condition()
+        self.__results = deque(maxlen=window)
+        self.__opened_at = 0.0
+        self.__probe = None
+
+    def before(self):
+        with self.__lock:
+            while True:
+                if self.state == "closed":
+                    return None
+
+                if self.state == "open":
+                    remaining = self.__opened_at + self.cooldown - time.monotonic()
+                    if remaining > 0:
+                        self.__lock.wait(remaining)
+                        continue
+                    self.state = "half-open"
+                    logging.info("Circuit half-open, probing the server")
+
+                if self.__probe is None:
+                    self.__probe = object()
+                    return self.__probe
+                self.__lock.wait()
+
+    def record(self, success: bool, probe=None):
+        with self.__lock:
+            if self.state != "closed":
+                if probe is None or probe is not self.__probe:
+                    return
+                self.__probe = None
+                if success:
+                    self.state = "closed"
+                    self.__results.clear()
+                    logging.info("Circuit closed, server is responding again")
+                else:
+                    self.__open()
+                self.__lock.notify_all()
+                return
+
+            self.__results.append(success)
+            failures = self.__results.count(False)
+            if (
+                self.state == "closed"
+                and len(self.__results) >= self.window
+                and failures / len(self.__results) >= self.threshold
+            ):
+                self.__open()
+
+    def __open(self):
+        self.state = "open"
+        self.__opened_at = time.monotonic()
+        logging.warning(
+            f"Too many server errors, pausing requests for {self.cooldown:.0f}s"
+        )
+        self.__lock.notify_all()
+
+
+def endpoint(url):
+    path = urlparse(url).path
+    if path.endswith("/auth/"):
+        return "auth"
+    if path.endswith("/share/apply"):
+        return "apply"
+    if path.endswith(("/search/", "/applicableIssue/", "/myShare/")):
+        return "search"
+    return "other"
+
+
+def is_failure(response):
+    return response.status_code == 429 or response.status_code >= 500
+
+
+host_limiter = RateLimiter(rate_)
+endpoint_limiters = {name: RateLimiter(rate) for name, rate in endpoint_rates_.items()}
+breaker_ = CircuitBreaker(breaker_window_, breaker_threshold_, breaker_cooldown_)
+
+# Called as observer(method, url, status, seconds, size, account) after every
+# request that reached the network; status is None when no response came back.
+observers_ = []
+
+
+def notify(*event):
+    for observer in list(observers_):
+        observer(*event)
+
+
+@lru_cache(maxsize=None)
+def session_class():
+    # requests is only imported once a session is actually needed, so
+    # commands answered from the journal or caches start without it.
+    import requests
+
+    class ThrottledSession(requests.Session):
+        # Whose requests these are, as passed on to the observers.
+        account = None
+
+        def admit(self, url, block=True):
+            # Waits for the circuit breaker and both rate limits, and returns
+            # the breaker's probe token for request(). Without `block` it only
+            # says whether a request can go out right away.
+            kind = endpoint(url)
+            host = urlparse(url).hostname
+            if not block:
+                return (
+                    breaker_.state == "closed"
+                    and endpoint_limiters[kind].try_wait(kind)
+                    and host_limiter.try_wait(host)
+                )
+            probe = breaker_.before()
+            host_limiter.wait(host)
+            endpoint_limiters[kind].wait(kind)
+            return probe
+
+        def request(self, method, url, *args, admitted=False, probe=None, **kwargs):
+            # `admitted` when the caller already went through admit(), with
+            # the `probe` it returned.
+            kind = endpoint(url)
+            if not admitted:
+                probe = self.admit(url)
+            kwargs.setdefault("timeout", timeouts_[kind])
+
+            start = time.perf_counter()
+            try:
+                response = super().request(method, url, *args, **kwargs)
+            except Exception:
+                breaker_.record(False, probe)
+                notify(method, url, None, time.perf_counter() - start, 0, self.account)
+                raise
+
+            seconds = time.perf_counter() - start
+            breaker_.record(not is_failure(response), probe)
+            if observers_:
+                notify(
+                    method,
+                    url,
+                    response.status_code,
+                    seconds,
+                    len(response.content),
+                    self.account,
+                )
+            return response
+
+    return ThrottledSession
+
+
+def new_session():
+    return session_class()()
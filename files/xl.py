@@ -1,166 +1,623 @@
+import argparse
 import os
-import pandas as pd
-from openpyxl import load_workbook
+import logging
 import datetime
+import time
 
 try:
-    from meroshare import MeroShare
+    from meroshare import (
+        MeroShare,
+        issues_,
+        is_applied,
+        configure_logging,
+        failed_statuses,
+    )
+    import engine
+    import session_pool
+    import hedging
+    from collector import ResultCollector
+    import sinks
+    from credentials import load_accounts, parse_rows
+    from journal import journal_, journaled, apply_key, allotment_key
+    import metrics
+    import throttle
+    from snapshots import snapshots_
+    import snapshots
+    import holdings
 except:
-    from files.meroshare import MeroShare
-
-
-def get_login_info(details, client_type):
-    return {
-        "name": details[1],
-        "username": details[4].replace(" ", ""),
-        "password": details[6],
-        "dpid": int(details[5]) - 13000000,
-        "client_id": client_type + str(details[0]),
-        "crn": details[7] if len(details) > 7 else None,
-        "pin": details[8] if len(details) > 8 else None,
-        "bank": details[9] if len(details) > 9 else None,
-    }
-
-
-def apply_ipo(sheet, full_list, client_type, Scrip, qty):
-    for details in sheet.iter_rows(min_row=2, min_col=1, values_only=True):
-        if str(details[2]).upper() == "NO" or str(details[3]).upper() == "NO":
-            continue
-
-        login_info = get_login_info(details, client_type)
-        ms = MeroShare(**login_info)
+    from files.meroshare import (
+        MeroShare,
+        issues_,
+        is_applied,
+        configure_logging,
+        failed_statuses,
+    )
+    from files import engine, session_pool, hedging
+    from files.collector import ResultCollector
+    from files import sinks
+    from files.credentials import load_accounts, parse_rows
+    from files.journal import journal_, journaled, apply_key, allotment_key
+    from files import metrics, throttle, snapshots, holdings
+    from files.snapshots import snapshots_
+
+
+final_statuses = {"alloted", "not alloted"}
+
+# How long before the opening "apply at open" logs in and prepares, and when
+# it re-opens connections that went idle in between.
+warm_lead_ = float(os.environ.get("MEROSHARE_WARM_LEAD", 300))
+keep_alive_lead_ = float(os.environ.get("MEROSHARE_KEEP_ALIVE_LEAD", 10))
+# Whether "List My Shares" in the menu also writes the consolidated tables.
+consolidate_ = os.environ.get("MEROSHARE_CONSOLIDATE", "").lower() in (
+    "1",
+    "yes",
+    "true",
+)
+
+
+def get_accounts(sheet, skip_inactive=True, skip_apply=False):
+    if isinstance(sheet, (list, tuple)):
+        accounts = sheet
+    else:
+        accounts, errors = parse_rows(
+            sheet.iter_rows(min_row=2, min_col=1, values_only=True)
+        )
+        for row, error in errors:
+            logging.warning(f"Skipping row {row}: {error}")
+
+    return [
+        account
+        for account in accounts
+        if (account.active or not skip_inactive) and (account.apply or not skip_apply)
+    ]
+
+
+def resolve_issue(accounts, client_type, Scrip):
+    # Looks the issue up with the first account that can log in, so the
+    # journal knows which issue is being applied for. Issue lists differ per
+    # account and the lookup can fail, so a miss doesn't end the batch: every
+    # account still checks its own list before applying.
+    issues_.clear()
+    for account in accounts:
+        ms = MeroShare(**account.login_info(client_type))
         if ms.login():
-            ms.apply(Scrip, qty)
-        data = [
-            ms.client_id,
-            details[1],
-            str(details[5]) + details[4].replace(" ", ""),
-            Scrip,
-            ms.status,
-        ]
-        full_list.loc[len(full_list)] = data
-    return full_list
-
-
-def check_account_status(sheet, full_list, client_type):
-    for details in sheet.iter_rows(min_row=2, min_col=1, values_only=True):
-        if str(details[2]).upper() == "NO":
-            continue
-
-        login_info = get_login_info(details, client_type)
-        ms = MeroShare(**login_info)
-        ms.login()
-        data = [
-            ms.client_id,
-            details[1],
-            str(details[5]) + details[4].replace(" ", ""),
-            ms.status,
-        ]
-        full_list.loc[len(full_list)] = data
-    return full_list
-
-
-def get_applicable_issues(sheet, full_list, client_type):
-    for details in sheet.iter_rows(min_row=2, min_col=1, values_only=True):
-        if str(details[2]).upper() == "NO" or str(details[3]).upper() == "NO":
-            continue
-
-        login_info = get_login_info(details, client_type)
-        ms = MeroShare(**login_info)
+            issue = issues_.resolve(Scrip, ms.get_applicable_issues)
+            if issue is None:
+                logging.info(
+                    f"{Scrip} isn't in the issue list of {account.name}, "
+                    "checking every account"
+                )
+            return issue
+    return None
+
+
+def collect(full_list, results):
+    # Results are buffered as plain rows and turned into a DataFrame once at
+    # the end; growing a DataFrame row by row is quadratic.
+    if isinstance(full_list, ResultCollector):
+        collector = full_list
+    else:
+        collector = ResultCollector(
+            full_list.columns, full_list.itertuples(index=False, name=None)
+        )
+
+    for result in results:
+        collector.extend(result)
+
+    return collector if collector is full_list else collector.to_frame()
+
+
+def apply_ipo(
+    sheet,
+    full_list,
+    client_type,
+    Scrip,
+    qty,
+    workers=None,
+    resume=False,
+    apply_workers=None,
+):
+    # Logins, the issue and bank lookups, and the applications themselves run
+    # as separate stages, so the next accounts log in while earlier ones are
+    # still being applied for.
+    def result(account, ms):
+        rows = [[ms.client_id, account.name, account.demat, Scrip, ms.status]]
+        key = apply_key(Scrip, issues_.get(Scrip))
+        journal_.record("apply", key, account.demat, ms.status, ms.applied, rows)
+        return rows
+
+    def login(account):
+        if resume and issues_.get(Scrip):
+            rows = journal_.completed(
+                "apply", apply_key(Scrip, issues_.get(Scrip)), account.demat
+            )
+            if rows is not None:
+                return engine.Finished(rows)
+
+        ms = MeroShare(**account.login_info(client_type))
+        if not ms.login():
+            return engine.Finished(result(account, ms))
+        return account, ms
+
+    def prepare(state):
+        account, ms = state
+        data = ms.prepare_application(Scrip, qty)
+        if data is None:
+            return engine.Finished(result(account, ms))
+        return account, ms, data
+
+    def submit(state):
+        account, ms, data = state
+        ms.submit_application(data, qty)
+        return result(account, ms)
+
+    accounts = get_accounts(sheet, skip_apply=True)
+    # The issue has to be known before the journal can say who applied.
+    resolve_issue(accounts, client_type, Scrip)
+
+    workers = workers or engine.workers_
+    stages = [
+        (login, workers),
+        (prepare, workers),
+        (submit, apply_workers or engine.apply_workers_),
+    ]
+    return collect(full_list, engine.pipeline(stages, accounts))
+
+
+def parse_open_time(value, now=None):
+    # "10:00", "10:00:30" (today) or a full "2026-10-19 10:00:00".
+    if isinstance(value, datetime.datetime):
+        return value
+    now = now or datetime.datetime.now()
+    for layout in ("%H:%M", "%H:%M:%S"):
+        try:
+            moment = datetime.datetime.strptime(value, layout).time()
+            return datetime.datetime.combine(now.date(), moment)
+        except ValueError:
+            pass
+    return datetime.datetime.fromisoformat(value)
+
+
+def wait_until(moment):
+    # Long naps first, then short ones, so the wake-up lands within a few
+    # milliseconds of `moment`.
+    while True:
+        remaining = moment.timestamp() - time.time()
+        if remaining <= 0:
+            return
+        time.sleep(remaining - 0.5 if remaining > 1 else min(remaining, 0.005))
+
+
+def apply_at_open(
+    sheet,
+    full_list,
+    client_type,
+    Scrip,
+    qty,
+    open_at,
+    workers=None,
+    resume=False,
+    apply_workers=None,
+    warm_lead=None,
+):
+    # Everything but the application itself is done ahead of the opening:
+    # logins, the issue (when it's already listed), the bank account and the
+    # request body. At the opening only the apply POSTs are sent.
+    open_at = parse_open_time(open_at)
+    warm_lead = warm_lead_ if warm_lead is None else warm_lead
+    fire_workers = apply_workers or workers or engine.workers_
+
+    def result(account, ms, sent=None, latency=None):
+        rows = [[ms.client_id, account.name, account.demat, Scrip, ms.status]]
+        key = apply_key(Scrip, issues_.get(Scrip))
+        journal_.record("apply", key, account.demat, ms.status, ms.applied, rows)
+        return [row + [sent, latency] for row in rows]
+
+    def warm(account):
+        # Nobody can have applied for an issue that isn't listed yet.
+        if resume and issues_.get(Scrip):
+            rows = journal_.completed(
+                "apply", apply_key(Scrip, issues_.get(Scrip)), account.demat
+            )
+            if rows is not None:
+                return [row + [None, None] for row in rows], None
+
+        ms = MeroShare(**account.login_info(client_type))
+        if not ms.login():
+            return result(account, ms), None
+        try:
+            if ms.prepare_bank() is None:
+                return result(account, ms), None
+        except Exception as error:
+            ms.status = f"Apply failed! - {error}"
+            return result(account, ms), None
+
+        # No body yet means the issue isn't listed yet; it's looked up again
+        # at the opening, unless this account has applied already.
+        data = ms.prepare_application(Scrip, qty)
+        if data is None and ms.applied:
+            return result(account, ms), None
+        return None, (account, ms, data)
+
+    def fire(state):
+        account, ms, data = state
+        start = time.perf_counter()
+        sent = (time.time() - open_at.timestamp()) * 1000
+        if data is None:
+            ms.get_applicable_issues()
+            data = ms.prepare_application(Scrip, qty)
+        if data is not None:
+            ms.submit_application(data, qty)
+        return result(
+            account, ms, round(sent, 1), round((time.perf_counter() - start) * 1000, 1)
+        )
+
+    accounts = get_accounts(sheet, skip_apply=True)
+    logging.info(f"Applying for {Scrip} at {open_at:%Y-%m-%d %H:%M:%S}")
+    wait_until(open_at - datetime.timedelta(seconds=warm_lead))
+
+    # Looked up once up front, so resuming knows which issue was applied for.
+    resolve_issue(accounts, client_type, Scrip)
+    warmed = list(engine.run(warm, accounts, workers))
+    ready = [state for rows, state in warmed if state is not None]
+    logging.info(
+        f"{len(ready)} of {len(accounts)} accounts ready, "
+        f"{sum(1 for state in ready if state[2] is None)} still waiting for {Scrip} "
+        "to be listed"
+    )
+
+    if ready and open_at.timestamp() - time.time() > keep_alive_lead_:
+        # Idle pooled connections may have been closed by the server since
+        # warming up; open enough of them again just before the opening.
+        wait_until(open_at - datetime.timedelta(seconds=keep_alive_lead_))
+        list(
+            engine.run(
+                lambda state: state[1].keep_alive(), ready[:fire_workers], fire_workers
+            )
+        )
+
+    wait_until(open_at)
+    fired = iter(engine.run(fire, ready, fire_workers))
+    results = [rows if state is None else next(fired) for rows, state in warmed]
+
+    sent = [rows[0][-2] for rows in results if rows[0][-2] is not None]
+    latency = [rows[0][-1] for rows in results if rows[0][-1] is not None]
+    if sent:
+        logging.info(
+            f"Submit latency: p50 {metrics.percentile(latency, 0.5):.0f}ms, "
+            f"p90 {metrics.percentile(latency, 0.9):.0f}ms, "
+            f"p99 {metrics.percentile(latency, 0.99):.0f}ms, "
+            f"max {max(latency):.0f}ms; last request sent "
+            f"{max(sent):.0f}ms after the opening"
+        )
+    return collect(full_list, results)
+
+
+def check_account_status(sheet, full_list, client_type, workers=None, resume=False):
+    def work(account):
+        ms = MeroShare(**account.login_info(client_type))
+        done = ms.login()
+        return [[ms.client_id, account.name, account.demat, ms.status]], ms.status, done
+
+    accounts = get_accounts(sheet)
+    work = journaled("status", "", work, resume)
+    return collect(full_list, engine.run(work, accounts, workers))
+
+
+def get_applicable_issues(sheet, full_list, client_type, workers=None, resume=False):
+    def work(account):
+        ms = MeroShare(**account.login_info(client_type))
         if ms.login():
             try:
-                for item in ms.get_applicable_issues():
-                    data = [
+                issues = ms.get_applicable_issues()
+                for item in issues:
+                    # Lets a resumed apply skip accounts that already applied
+                    # without logging them in again.
+                    if is_applied(item):
+                        status = f"Couldn't apply for issue! - {item['action']}"
+                        journal_.record(
+                            "apply",
+                            apply_key(item["scrip"], item),
+                            account.demat,
+                            status,
+                            True,
+                            [
+                                [
+                                    ms.client_id,
+                                    account.name,
+                                    account.demat,
+                                    item["scrip"],
+                                    status,
+                                ]
+                            ],
+                        )
+                rows = [
+                    [
                         ms.client_id,
-                        details[1],
-                        str(details[5]) + details[4].replace(" ", ""),
+                        account.name,
+                        account.demat,
                         item["scrip"],
                         item["shareGroupName"],
                         item["shareTypeName"],
                         item.get("reservationTypeName", "NA"),
                     ]
-                    full_list.loc[len(full_list)] = data
-            except:
-                full_list.loc[len(full_list)] = [
-                    ms.client_id,
-                    details[1],
-                    str(details[5]) + details[4].replace(" ", ""),
-                    ms.status,
-                    "NA",
-                    "NA",
-                    "NA",
+                    for item in issues
                 ]
+                return rows, ms.status, True
+            except:
+                pass
+        rows = [
+            [ms.client_id, account.name, account.demat, ms.status, "NA", "NA", "NA"]
+        ]
+        return rows, ms.status, False
+
+    accounts = get_accounts(sheet, skip_apply=True)
+    work = journaled("issues", "", work, resume)
+    return collect(full_list, engine.run(work, accounts, workers))
+
+
+def application_statuses(ms, account, scrips):
+    # The search still runs every time, since it says which application a
+    # scrip is now; only the report details of applications with a final
+    # status in the journal are skipped.
+    applications = ms.find_applications()
+    if applications is None:
+        return {scrip: ms.status for scrip in scrips}
+
+    statuses = {}
+    for scrip in scrips:
+        if scrip in applications:
+            key = allotment_key(scrip, applications[scrip])
+            status = journal_.outcome("allotment", key, account.demat)
+            if status is not None:
+                statuses[scrip] = status
+
+    pending = [scrip for scrip in scrips if scrip not in statuses]
+    if pending:
+        statuses.update(ms.get_application_statuses(pending, applications))
+    for scrip in pending:
+        if scrip in applications and str(statuses[scrip]).lower() in final_statuses:
+            key = allotment_key(scrip, applications[scrip])
+            journal_.record("allotment", key, account.demat, statuses[scrip], True, [])
+    return statuses
+
+
+def check_ipo_status(sheet, full_list, client_type, Scrip, workers=None, resume=False):
+    # Accepts several scrips ("ABC, XYZ" or a list). Final results are kept
+    # in the journal, so polling again only asks about pending applications.
+    scrips = (
+        [scrip.strip() for scrip in Scrip.split(",") if scrip.strip()]
+        if isinstance(Scrip, str)
+        else list(Scrip)
+    )
+
+    def work(account):
+        ms = MeroShare(**account.login_info(client_type))
+        if ms.login():
+            statuses = application_statuses(ms, account, scrips)
         else:
-            full_list.loc[len(full_list)] = [
-                ms.client_id,
-                details[1],
-                str(details[5]) + details[4].replace(" ", ""),
-                ms.status,
-                "NA",
-                "NA",
-                "NA",
-            ]
-    return full_list
-
-
-def check_ipo_status(sheet, full_list, client_type, Scrip):
-    for details in sheet.iter_rows(min_row=2, min_col=1, values_only=True):
-        if str(details[2]).upper() == "NO" or str(details[3]).upper() == "NO":
-            continue
+            statuses = {scrip: ms.status for scrip in scrips}
 
-        login_info = get_login_info(details, client_type)
-        ms = MeroShare(**login_info)
-        ms.login()
-        ms.get_application_status(Scrip)
-        data = [
-            ms.client_id,
-            details[1],
-            str(details[5]) + details[4].replace(" ", ""),
-            Scrip,
-            ms.status,
+        rows = [
+            [ms.client_id, account.name, account.demat, scrip, statuses[scrip]]
+            for scrip in scrips
         ]
-        full_list.loc[len(full_list)] = data
-    return full_list
+        done = all(
+            str(status).lower() in final_statuses for status in statuses.values()
+        )
+        return rows, ms.status, done
 
+    accounts = get_accounts(sheet, skip_apply=True)
+    work = journaled("app-status", ",".join(scrips), work, resume)
+    return collect(full_list, engine.run(work, accounts, workers))
 
-def list_shares(sheet, full_list, client_type):
-    for details in sheet.iter_rows(min_row=2, min_col=1, values_only=True):
-        if str(details[2]).upper() == "NO":
-            continue
 
-        login_info = get_login_info(details, client_type)
-        ms = MeroShare(**login_info)
+def list_shares(sheet, full_list, client_type, workers=None, resume=False):
+    def work(account):
+        ms = MeroShare(**account.login_info(client_type))
         if ms.login():
             try:
-                full_list = (
-                    ms.get_share_list()
-                    if full_list.empty
-                    else pd.concat([full_list, ms.get_share_list()])
-                )
+                rows = ms.get_share_rows()
+                if rows is not None:
+                    snapshots_.record(account.demat, rows)
+                    return rows, ms.status, True
             except:
-                full_list.loc[len(full_list)] = [
-                    client_type + str(details[0]),
-                    details[1],
-                    str(details[5]) + details[4].replace(" ", ""),
-                    ms.status,
-                    0,
-                    0,
-                ]
-        else:
-            full_list.loc[len(full_list)] = [
-                client_type + str(details[0]),
-                details[1],
-                str(details[5]) + details[4].replace(" ", ""),
+                pass
+        rows = [
+            [
+                account.client_id(client_type),
+                account.name,
+                account.demat,
                 ms.status,
                 0,
                 0,
             ]
-    return full_list
-
-
-def main():
-    book = load_workbook(filename="MeroShare Login Details.xlsx", data_only=True)
-    sheet = book["List"]
+        ]
+        return rows, ms.status, False
+
+    accounts = get_accounts(sheet)
+    work = journaled("shares", "", work, resume)
+    return collect(full_list, engine.run(work, accounts, workers))
+
+
+def diff_shares(
+    sheet, full_list, client_type, since=None, until=None, workers=None, resume=False
+):
+    # Works from the stored snapshots only; nothing is asked of the server.
+    until = until or snapshots.today()
+    if since is None and not snapshots_.previous(until):
+        logging.warning(f"No snapshot before {until} to compare with")
+        return collect(full_list, [])
+
+    accounts = get_accounts(sheet)
+    if since is None:
+        logging.info(f"Comparing share lists of {until} with each one's previous")
+    else:
+        logging.info(f"Comparing share lists of {since} and {until}")
+    rows = snapshots.diff(since, until, [account.demat for account in accounts])
+    logging.info(f"{len(rows)} changes")
+    return collect(full_list, [rows])
+
+
+def list_share_changes(sheet, full_list, client_type, workers=None, resume=False):
+    # Takes today's snapshot like 'shares' but only outputs what changed
+    # since the last one.
+    shares = ResultCollector(reports["shares"][1], keep=False)
+    list_shares(sheet, shares, client_type, workers, resume)
+    return diff_shares(sheet, full_list, client_type)
+
+
+operations = {
+    "status": check_account_status,
+    "shares": list_shares,
+    "issues": get_applicable_issues,
+    "shares-changes": list_share_changes,
+    "shares-diff": diff_shares,
+    "apply": apply_ipo,
+    "apply-at-open": apply_at_open,
+    "app-status": check_ipo_status,
+}
+
+reports = {
+    "status": ("MeroShare Account Status", ["Client ID", "Name", "Demat", "Status"]),
+    "shares": (
+        "MeroShare - Share List - {date}",
+        [
+            "Client ID",
+            "Name",
+            "DMAT No",
+            "Script",
+            "Current Balance",
+            "Free Balance",
+        ],
+    ),
+    "shares-changes": ("MeroShare - Share Changes - {date}", snapshots.diff_columns),
+    "shares-diff": ("MeroShare - Share Changes - {date}", snapshots.diff_columns),
+    "issues": (
+        "Applicable Issue List",
+        [
+            "Client ID",
+            "Name",
+            "Demat",
+            "Script",
+            "Share Group",
+            "Type",
+            "Reservation Type",
+        ],
+    ),
+    "apply": (
+        "IPO Applied for {scrip}",
+        ["Client ID", "Name", "Demat", "Script", "Application"],
+    ),
+    "apply-at-open": (
+        "IPO Applied for {scrip}",
+        [
+            "Client ID",
+            "Name",
+            "Demat",
+            "Script",
+            "Application",
+            "Sent After Open (ms)",
+            "Submit Latency (ms)",
+        ],
+    ),
+    "app-status": (
+        "Application Status for {scrip}",
+        ["Client ID", "Name", "Demat", "Scrip", "Status"],
+    ),
+}
+
+
+def export(name, columns, run, output_format="xlsx"):
+    # Rows go to the output file as each account finishes instead of being
+    # collected into one frame and written at the very end.
+    sink = sinks.open_sink(output_format, name, columns)
+    collector = ResultCollector(columns, keep=False)
+    collector.subscribe(sink.write)
+    try:
+        run(collector)
+    finally:
+        sink.close()
+    return collector
+
+
+def consolidate_shares(accounts, name, output_format="xlsx", taken=None):
+    # Per-scrip and per-account totals and a scrip x account table of the
+    # day's share lists, written next to the share list itself.
+    demats = [account.demat for account in get_accounts(accounts)]
+    frame = holdings.snapshot_frame(snapshots_, taken or snapshots.today(), demats)
+    tables = holdings.consolidate(frame)
+    holdings.log_summary(tables)
+    return holdings.export(tables, name, output_format)
+
+
+def report_name(operation, **options):
+    scrip = options.get("Scrip")
+    return reports[operation][0].format(
+        date=datetime.datetime.now().strftime("%d-%b-%Y"),
+        scrip=scrip if isinstance(scrip, str) or scrip is None else ", ".join(scrip),
+    )
+
+
+def run_report(
+    operation,
+    accounts,
+    output_format="xlsx",
+    name=None,
+    metrics_file=None,
+    consolidate=False,
+    **options,
+):
+    columns = reports[operation][1]
+    name = name or report_name(operation, **options)
+
+    run_metrics = metrics.RunMetrics(operation)
+    throttle.observers_.append(run_metrics)
+    try:
+        collector = export(
+            name,
+            columns,
+            lambda df: operations[operation](accounts, df, "", **options),
+            output_format,
+        )
+    finally:
+        throttle.observers_.remove(run_metrics)
+        run_metrics.finish()
+        run_metrics.log(logging)
+        metrics_file = metrics_file or metrics.metrics_file
+        if metrics_file:
+            logging.info(f"Run metrics written to {run_metrics.export(metrics_file)}")
+
+    if consolidate:
+        consolidate_shares(accounts, name, output_format)
+    return collector
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--format",
+        choices=sorted(sinks.sinks_),
+        default=os.environ.get("MEROSHARE_OUTPUT", "xlsx"),
+        help="output file format; csv, jsonl and parquet are written as rows "
+        "arrive (every MEROSHARE_FLUSH_EVERY rows), xlsx only at the end, so a "
+        "crash loses the whole xlsx file",
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="skip clients already completed in an earlier, interrupted run",
+    )
+    args = parser.parse_args(argv)
+    configure_logging()
+
+    choices = {
+        "1": "status",
+        "2": "shares",
+        "3": "issues",
+        "4": "apply",
+        "5": "app-status",
+    }
 
     while True:
         print("Please select an option: \n")
@@ -176,59 +633,25 @@ def main():
         if choice == "0":
             break
 
-        elif choice == "1":
-            df = pd.DataFrame(columns=["Client ID", "Name", "Demat", "Status"])
-            df = check_account_status(sheet, df, "")
-            df.to_excel("MeroShare Account Status.xlsx", index=False)
-
-        elif choice == "2":
-            df = pd.DataFrame(
-                columns=[
-                    "Client ID",
-                    "Name",
-                    "DMAT No",
-                    "Script",
-                    "Current Balance",
-                    "Free Balance",
-                ]
-            )
-            df = list_shares(sheet, df, "")
-            filename = f'MeroShare - Share List - {datetime.datetime.now().strftime("%d-%b-%Y")}.xlsx'
-            df.to_excel(filename, index=False)
-
-        elif choice == "3":
-            df = pd.DataFrame(
-                columns=[
-                    "Client ID",
-                    "Name",
-                    "Demat",
-                    "Script",
-                    "Share Group",
-                    "Type",
-                    "Reservation Type",
-                ]
-            )
-            df = get_applicable_issues(sheet, df, "")
-            df.to_excel("Applicable Issue List.xlsx", index=False)
+        if choice not in choices:
+            print("Invalid choice!")
+            continue
 
+        options = {"resume": args.resume}
+        if choice == "2":
+            options["consolidate"] = consolidate_
         elif choice == "4":
-            scrip = input("Script Code to Apply For: ")
-            qty = input("No. of Kitta to Apply: ")
-            df = pd.DataFrame(
-                columns=["Client ID", "Name", "Demat", "Script", "Application"]
-            )
-            df = apply_ipo(sheet, df, "", scrip, qty)
-            df.to_excel(f"IPO Applied for {scrip}.xlsx", index=False)
-
+            options["Scrip"] = input("Script Code to Apply For: ")
+            options["qty"] = input("No. of Kitta to Apply: ")
         elif choice == "5":
-            scrip = input("Script Code to Check: ")
-            df = pd.DataFrame(columns=["Client ID", "Name", "Demat", "Scrip", "Status"])
-            df = check_ipo_status(sheet, df, "", scrip)
-            df.to_excel(f"Application Status for {scrip}.xlsx", index=False)
+            options["Scrip"] = input("Script Code(s) to Check (comma separated): ")
 
-        else:
-            print("Invalid choice!")
-            continue
+        # Parsed once and reused until the workbook is saved again.
+        accounts, _ = load_accounts()
+        run_report(choices[choice], accounts, args.format, **options)
+
+        session_pool.log_stats(logging)
+        hedging.log_stats(logging)
 
         input("Press Enter to Continue....")
 
@@ -0,0 +1,63 @@
+import base64
+import json
+import os
+import time
+
+import pytest
+
+from files import auth_cache
+
+
+def jwt(expires):
+    payload = base64.urlsafe_b64encode(json.dumps({"exp": expires}).encode())
+    return f"header.{payload.decode().rstrip('=')}.signature"
+
+
+def test_expiry_is_read_from_the_token():
+    expires = time.time() + 3600
+    assert auth_cache.token_expiry(jwt(expires)) == pytest.approx(expires)
+    # As sent in the Authorization header.
+    assert auth_cache.token_expiry("Bearer " + jwt(expires)) == pytest.approx(expires)
+
+
+def test_unreadable_tokens_get_the_fallback_ttl():
+    assert auth_cache.token_expiry("opaque", ttl=60) == pytest.approx(
+        time.time() + 60, abs=1
+    )
+
+
+def test_tokens_are_kept_until_shortly_before_they_expire():
+    store = auth_cache.TokenStore(margin=30)
+    store.put(1, "00000001", jwt(time.time() + 3600), "Login OK")
+    store.put(1, "00000002", jwt(time.time() + 10), "Login OK")
+
+    assert store.get(1, "00000001")[1] == "Login OK"
+    assert store.get("1", 1) is None
+    # Within the margin the token is dropped rather than used.
+    assert store.get(1, "00000002") is None
+
+
+def test_discard():
+    store = auth_cache.TokenStore()
+    store.put(1, "00000001", jwt(time.time() + 3600))
+    store.discard(1, "00000001")
+    assert store.get(1, "00000001") is None
+
+
+def test_tokens_are_not_saved_without_a_key(tmp_path):
+    path = os.path.join(tmp_path, "tokens")
+    store = auth_cache.TokenStore(path)
+    store.put(1, "00000001", jwt(time.time() + 3600))
+    assert not os.path.exists(path)
+
+
+def test_tokens_are_saved_encrypted_with_a_key(tmp_path):
+    fernet = pytest.importorskip("cryptography.fernet")
+    key = fernet.Fernet.generate_key().decode()
+    path = os.path.join(tmp_path, "tokens")
+    token = jwt(time.time() + 3600)
+    auth_cache.TokenStore(path, key).put(1, "00000001", token)
+
+    with open(path, "rb") as saved:
+        assert token.encode() not in saved.read()
+    assert auth_cache.TokenStore(path, key).get(1, "00000001")[0] == token
@@ -0,0 +1,93 @@
+import json
+import os
+
+import pytest
+
+from files import banks
+
+bank_list = [
+    {"id": 3, "name": "GLOBAL IME BANK LTD."},
+    {"id": 4, "name": "NABIL BANK LTD."},
+]
+detail = {"accountNumber": "00112233445566", "id": 998877, "accountBranchId": 12}
+
+
+class Fetch:
+    def __init__(self, value):
+        self.value = value
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return self.value
+
+
+@pytest.mark.parametrize(
+    "name", ["Global IME Bank Ltd.", "GLOBAL IME BANK LTD", "  global  ime bank ltd "]
+)
+def test_normalize(name):
+    assert banks.normalize(name) == "GLOBAL IME BANK LTD"
+
+
+def test_normalize_empty():
+    assert banks.normalize(None) == ""
+
+
+def test_bank_list_is_fetched_once():
+    cache = banks.BankCache()
+    fetch = Fetch(bank_list)
+    assert cache.get_bank_id("Nabil Bank Ltd", fetch) == 4
+    assert cache.get_bank_id("Global IME Bank Ltd.", fetch) == 3
+    assert fetch.calls == 1
+
+
+def test_unknown_bank_refreshes_a_saved_list_once(tmp_path):
+    path = os.path.join(tmp_path, "banks.json")
+    banks.BankCache(path).get_bank_id("Nabil Bank Ltd", Fetch(bank_list[1:]))
+
+    cache = banks.BankCache(path)
+    fetch = Fetch(bank_list)
+    assert cache.get_bank_id("Global IME Bank Ltd.", fetch) == 3
+    assert cache.get_bank_id("Unknown Bank", fetch) is None
+    assert fetch.calls == 1
+
+
+def test_details_are_fetched_once_per_account():
+    cache = banks.BankCache()
+    fetch = Fetch(detail)
+    assert cache.get_detail("1301090000000001", 3, fetch) == detail
+    assert cache.get_detail("1301090000000001", 3, fetch) == detail
+    cache.get_detail("1301090000000002", 3, fetch)
+    assert fetch.calls == 2
+
+
+def test_details_are_not_saved_without_a_key(tmp_path):
+    path = os.path.join(tmp_path, "banks.json")
+    cache = banks.BankCache(path)
+    cache.get_bank_id("Nabil Bank Ltd", Fetch(bank_list))
+    cache.get_detail("1301090000000001", 4, Fetch(detail))
+
+    with open(path) as saved:
+        text = saved.read()
+    assert detail["accountNumber"] not in text
+    assert json.loads(text)["banks"]["NABIL BANK LTD"] == 4
+
+    fetch = Fetch(bank_list)
+    assert banks.BankCache(path).get_bank_id("Nabil Bank Ltd", fetch) == 4
+    assert fetch.calls == 0
+
+
+def test_details_are_saved_encrypted_with_a_key(tmp_path):
+    fernet = pytest.importorskip("cryptography.fernet")
+    key = fernet.Fernet.generate_key().decode()
+    path = os.path.join(tmp_path, "banks.json")
+    banks.BankCache(path, key).get_detail("1301090000000001", 4, Fetch(detail))
+
+    with open(path) as saved:
+        assert detail["accountNumber"] not in saved.read()
+
+    fetch = Fetch(detail)
+    assert banks.BankCache(path, key).get_detail("1301090000000001", 4, fetch) == (
+        detail
+    )
+    assert fetch.calls == 0
@@ -0,0 +1,79 @@
+import json
+import os
+import time
+
+import pytest
+
+from files.capitals import CapitalRegistry
+
+capital_list = [{"code": "10900", "id": 1}, {"code": "11000", "id": 2}]
+
+
+class Fetch:
+    def __init__(self, value):
+        self.value = value
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        if isinstance(self.value, Exception):
+            raise self.value
+        return self.value
+
+
+@pytest.fixture
+def path(tmp_path):
+    return os.path.join(tmp_path, "capitals.json")
+
+
+def save(path, capitals, age=0):
+    with open(path, "w") as cap_file:
+        json.dump(capitals, cap_file)
+    modified = time.time() - age
+    os.utime(path, (modified, modified))
+
+
+def test_missing_file_is_downloaded_and_saved(path):
+    fetch = Fetch(capital_list)
+    registry = CapitalRegistry(path, fetch)
+
+    assert registry.get(10900) == 1
+    assert registry.get("11000") == 2
+    assert fetch.calls == 1
+    with open(path) as cap_file:
+        assert json.load(cap_file) == capital_list
+
+
+def test_fresh_file_is_used_as_it_is(path):
+    save(path, capital_list)
+    fetch = Fetch([])
+    assert CapitalRegistry(path, fetch, ttl=60).get(10900) == 1
+    assert fetch.calls == 0
+
+
+def test_stale_file_is_downloaded_again(path):
+    save(path, capital_list[:1], age=120)
+    fetch = Fetch(capital_list)
+    assert CapitalRegistry(path, fetch, ttl=60).get(11000) == 2
+    assert fetch.calls == 1
+
+
+def test_unknown_codes_refresh_only_once(path):
+    save(path, capital_list[:1])
+    fetch = Fetch(capital_list)
+    registry = CapitalRegistry(path, fetch, ttl=60)
+
+    assert registry.get(11000) == 2
+    assert registry.get(99999) is None
+    assert registry.get(88888) is None
+    assert fetch.calls == 1
+
+
+def test_failed_download_keeps_the_saved_list(path):
+    save(path, capital_list, age=120)
+    fetch = Fetch(OSError("offline"))
+    registry = CapitalRegistry(path, fetch, ttl=60)
+
+    assert registry.get(10900) == 1
+    assert registry.get(99999) is None
+    assert fetch.calls == 1
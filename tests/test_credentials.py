@@ -0,0 +1,25 @@
+from files.credentials import parse_rows
+
+
+def test_short_rows_are_padded():
+    accounts, errors = parse_rows(
+        [(1, "Client 1", "YES", "YES", "00000001", 13010900, "pw")]
+    )
+
+    assert errors == []
+    assert accounts[0].demat == "1301090000000001"
+    assert accounts[0].crn is None and accounts[0].bank is None
+
+
+def test_invalid_rows_are_reported_with_their_number():
+    rows = [
+        (1, "Client 1", "YES", "YES", "00000001", 13010900, "pw"),
+        (None,) * 10,
+        (3, "Client 3", "YES", "YES", None, 13010900, "pw"),
+        (4, "Client 4", "YES", "YES", "00000004", "not a DP", "pw"),
+    ]
+
+    accounts, errors = parse_rows(rows)
+
+    assert [account.serial for account in accounts] == [1]
+    assert [row for row, error in errors] == [4, 5]
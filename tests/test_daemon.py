@@ -0,0 +1,121 @@
+import threading
+
+import pytest
+import requests
+
+from files import daemon
+
+
+class State:
+    def health(self):
+        return {"ok": True}
+
+
+def start(token):
+    server, address = daemon.serve(State(), "127.0.0.1", 0, token=token)
+    threading.Thread(
+        target=server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True
+    ).start()
+    return server, address
+
+
+@pytest.fixture
+def open_daemon():
+    server, address = start(None)
+    yield address
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def token_daemon():
+    server, address = start("secret")
+    yield address
+    server.shutdown()
+    server.server_close()
+
+
+def test_local_requests_are_served(open_daemon):
+    assert requests.get(open_daemon + "/health").json() == {"ok": True}
+
+
+def test_requests_from_web_pages_are_refused(open_daemon, token_daemon):
+    page = {"Origin": "http://example.com"}
+    auth = {"Authorization": "Bearer secret"}
+    assert requests.get(open_daemon + "/health", headers=page).status_code == 403
+    assert (
+        requests.get(token_daemon + "/health", headers={**auth, **page}).status_code
+        == 403
+    )
+
+
+def test_other_hosts_are_refused_without_a_token(open_daemon, token_daemon):
+    # A DNS name rebound to 127.0.0.1 arrives with that name as the Host.
+    rebound = {"Host": "example.com:8765"}
+    assert requests.get(open_daemon + "/health", headers=rebound).status_code == 403
+    for host in ("localhost:8765", "[::1]:8765", "127.0.0.1"):
+        assert (
+            requests.get(open_daemon + "/health", headers={"Host": host}).status_code
+            == 200
+        )
+
+    auth = {"Authorization": "Bearer secret"}
+    assert (
+        requests.get(token_daemon + "/health", headers={**auth, **rebound}).status_code
+        == 200
+    )
+
+
+def test_token_is_required_when_set(token_daemon):
+    assert requests.get(token_daemon + "/health").status_code == 401
+    assert (
+        requests.get(
+            token_daemon + "/health", headers={"Authorization": "Bearer wrong"}
+        ).status_code
+        == 401
+    )
+    assert (
+        requests.get(
+            token_daemon + "/health", headers={"Authorization": "Bearer secret"}
+        ).status_code
+        == 200
+    )
+
+
+def test_apply_needs_a_token(open_daemon, token_daemon):
+    body = {"scrip": "ABC", "qty": 0}
+    assert requests.post(open_daemon + "/apply", json=body).status_code == 403
+    # Past the checks, the missing quantity is what's refused.
+    assert (
+        requests.post(
+            token_daemon + "/apply",
+            json=body,
+            headers={"Authorization": "Bearer secret"},
+        ).status_code
+        == 400
+    )
+
+
+def test_posts_must_be_json(token_daemon):
+    response = requests.post(
+        token_daemon + "/apply",
+        data='{"scrip": "ABC", "qty": 10}',
+        headers={"Authorization": "Bearer secret", "Content-Type": "text/plain"},
+    )
+    assert response.status_code == 415
+
+
+class Session:
+    status = "Application status request failed."
+
+
+def test_failed_answers_are_not_cached():
+    def work(account, ms):
+        return [[ms.status]] if account == "down" else ([["ok"]], "ok", True)
+
+    assert daemon.checked(work)("down", Session()) == (
+        [[Session.status]],
+        Session.status,
+        False,
+    )
+    assert daemon.checked(work)("up", Session()) == ([["ok"]], "ok", True)
@@ -0,0 +1,126 @@
+import random
+import time
+
+import pytest
+
+from files import engine
+
+
+def slow(work):
+    # Finishes items out of order.
+    def run(value):
+        time.sleep(random.uniform(0, 0.005))
+        return work(value)
+
+    return run
+
+
+def test_run_keeps_the_order_of_the_items():
+    items = list(range(30))
+    assert list(engine.run(slow(lambda value: value * 2), items, 8)) == [
+        value * 2 for value in items
+    ]
+
+
+def test_run_one_by_one():
+    assert list(engine.run(str, range(3), 1)) == ["0", "1", "2"]
+
+
+def test_run_raises_the_first_failure_in_order():
+    def fail_on_three(value):
+        if value == 3:
+            raise RuntimeError("server down")
+        return value
+
+    results = engine.run(slow(fail_on_three), range(10), 4)
+
+    assert [next(results) for _ in range(3)] == [0, 1, 2]
+    with pytest.raises(RuntimeError, match="server down"):
+        next(results)
+
+
+def test_pipeline_keeps_the_order_of_the_items():
+    items = list(range(50))
+    stages = [
+        (slow(lambda value: value + 1), 4),
+        (slow(lambda value: value * 10), 3),
+        (slow(str), 1),
+    ]
+    assert list(engine.pipeline(stages, items)) == [
+        str((value + 1) * 10) for value in items
+    ]
+
+
+def test_pipeline_with_one_item_per_queue():
+    items = list(range(20))
+    stages = [(slow(lambda value: value), 2), (slow(lambda value: -value), 2)]
+    assert list(engine.pipeline(stages, items, queue_size=1)) == [
+        -value for value in items
+    ]
+
+
+def test_pipeline_without_items():
+    assert list(engine.pipeline([(str, 1)], [])) == []
+
+
+def test_finished_items_skip_the_remaining_stages():
+    seen = []
+
+    def login(value):
+        return engine.Finished(f"{value} failed") if value % 3 == 0 else value
+
+    def submit(value):
+        seen.append(value)
+        return f"{value} applied"
+
+    results = list(engine.pipeline([(login, 2), (submit, 2)], range(7)))
+
+    assert results == [
+        "0 failed",
+        "1 applied",
+        "2 applied",
+        "3 failed",
+        "4 applied",
+        "5 applied",
+        "6 failed",
+    ]
+    assert sorted(seen) == [1, 2, 4, 5]
+
+
+def test_pipeline_raises_after_the_items_before_the_failure():
+    def fail_on_five(value):
+        if value == 5:
+            raise RuntimeError("server down")
+        return value
+
+    results = engine.pipeline([(slow(fail_on_five), 3), (str, 1)], range(20))
+
+    assert [next(results) for _ in range(5)] == ["0", "1", "2", "3", "4"]
+    with pytest.raises(RuntimeError, match="server down"):
+        next(results)
+
+
+def test_pipeline_stops_starting_work_after_a_failure():
+    started = []
+
+    def fail_first(value):
+        started.append(value)
+        if value == 0:
+            raise RuntimeError("server down")
+        time.sleep(0.01)
+        return value
+
+    with pytest.raises(RuntimeError):
+        list(engine.pipeline([(fail_first, 1)], range(100), queue_size=2))
+    time.sleep(0.1)
+
+    assert len(started) < 10
+
+
+def test_worker_count_rejects_less_than_one(monkeypatch):
+    monkeypatch.setenv("MEROSHARE_APPLY_WORKERS", "0")
+    with pytest.raises(ValueError):
+        engine.worker_count("MEROSHARE_APPLY_WORKERS", 2)
+
+    monkeypatch.setenv("MEROSHARE_APPLY_WORKERS", "3")
+    assert engine.worker_count("MEROSHARE_APPLY_WORKERS", 2) == 3
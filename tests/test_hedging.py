@@ -0,0 +1,41 @@
+import pytest
+
+from files import hedging
+
+
+@pytest.fixture
+def tracker(monkeypatch):
+    tracker = hedging.LatencyTracker(100)
+    monkeypatch.setattr(hedging, "tracker_", tracker)
+    monkeypatch.setattr(hedging, "percentile_", 0.9)
+    monkeypatch.setattr(hedging, "min_samples_", 10)
+    monkeypatch.setattr(hedging, "delay_", 2.0)
+    monkeypatch.setattr(hedging, "min_delay_", 0.05)
+    return tracker
+
+
+def test_fixed_delay_until_enough_samples(tracker):
+    for _ in range(9):
+        tracker.record("/shares", 0.1)
+    assert hedging.hedge_delay("/shares") == 2.0
+
+
+def test_delay_follows_the_percentile(tracker):
+    for latency in range(1, 101):
+        tracker.record("/shares", latency / 100)
+    assert hedging.hedge_delay("/shares") == pytest.approx(0.9, abs=0.01)
+    # Each endpoint has its own latencies.
+    assert hedging.hedge_delay("/issues") == 2.0
+
+
+def test_delay_has_a_floor(tracker):
+    for _ in range(20):
+        tracker.record("/shares", 0.001)
+    assert hedging.hedge_delay("/shares") == 0.05
+
+
+def test_window_keeps_the_recent_latencies():
+    tracker = hedging.LatencyTracker(3)
+    for latency in (5, 1, 2, 3):
+        tracker.record("/shares", latency)
+    assert tracker.latencies("/shares") == [1, 2, 3]
@@ -0,0 +1,83 @@
+import os
+import time
+
+import pytest
+
+from files import journal
+
+
+class Account:
+    def __init__(self, demat):
+        self.demat = demat
+
+
+@pytest.fixture
+def journal_(tmp_path, monkeypatch):
+    store = journal.Journal(os.path.join(tmp_path, "journal.sqlite3"))
+    monkeypatch.setattr(journal, "journal_", store)
+    yield store
+    store.close()
+
+
+def counting(done=True):
+    calls = []
+
+    def work(account):
+        calls.append(account.demat)
+        return [[account.demat, "OK"]], "OK", done
+
+    return work, calls
+
+
+def test_every_outcome_is_recorded(journal_):
+    work, calls = counting()
+    run = journal.journaled("status", "", work)
+
+    assert run(Account("1")) == [["1", "OK"]]
+    assert journal_.completed("status", "", "1") == [["1", "OK"]]
+    assert journal_.outcome("status", "", "1") == "OK"
+
+
+def test_resume_skips_accounts_already_done(journal_):
+    work, calls = counting()
+    journal.journaled("status", "", work)(Account("1"))
+
+    run = journal.journaled("status", "", work, resume=True)
+    assert run(Account("1")) == [["1", "OK"]]
+    assert run(Account("2")) == [["2", "OK"]]
+    assert calls == ["1", "2"]
+
+
+def test_without_resume_accounts_are_run_again(journal_):
+    work, calls = counting()
+    journal.journaled("status", "", work)(Account("1"))
+    journal.journaled("status", "", work)(Account("1"))
+    assert calls == ["1", "1"]
+
+
+def test_unfinished_outcomes_are_run_again(journal_):
+    work, calls = counting(done=False)
+    journal.journaled("shares", "", work)(Account("1"))
+    journal.journaled("shares", "", work, resume=True)(Account("1"))
+    assert calls == ["1", "1"]
+
+
+def test_old_outcomes_are_run_again(journal_):
+    work, calls = counting()
+    journal.journaled("status", "", work)(Account("1"))
+    time.sleep(0.02)
+    journal.journaled("status", "", work, resume=True, max_age=0.01)(Account("1"))
+    assert calls == ["1", "1"]
+
+
+def test_outcomes_are_kept_per_scrip(journal_):
+    work, calls = counting()
+    journal.journaled("app-status", "ABC", work)(Account("1"))
+    journal.journaled("app-status", "XYZ", work, resume=True)(Account("1"))
+    assert calls == ["1", "1"]
+
+
+def test_apply_keys_follow_the_issue():
+    assert journal.apply_key("ABC") == "ABC"
+    assert journal.apply_key("ABC", {"companyShareId": 701}) == "ABC#701"
+    assert journal.allotment_key("ABC", {"applicantFormId": 55}) == "ABC#55"
@@ -0,0 +1,34 @@
+from files import meroshare, metrics
+
+
+def test_percentile():
+    assert metrics.percentile([], 0.5) == 0.0
+    assert metrics.percentile([3, 1, 2], 0.5) == 2
+    assert metrics.percentile(list(range(101)), 0.99) == 99
+
+
+def test_requests_are_counted_per_account():
+    run = metrics.RunMetrics("status")
+    url = "http://127.0.0.1/api/meroShare/ownDetail/"
+    run("GET", url, 200, 0.5, 10, "1301090000000001")
+    run("GET", url, 200, 0.25, 10, "1301090000000001")
+    run("GET", url, 503, 2.0, 10, "1301090000000002")
+
+    summary = run.summary()
+
+    assert summary["requests"] == 3
+    assert summary["failures"] == 1
+    assert [
+        (account["account"], account["requests"])
+        for account in summary["slowest_accounts"]
+    ] == [("1301090000000002", 1), ("1301090000000001", 2)]
+
+
+def test_requests_are_attributed_to_the_demat(monkeypatch):
+    monkeypatch.setattr(meroshare.capitals_, "get", lambda dpid: 1)
+    # Names are optional and may repeat.
+    first = meroshare.MeroShare(name=None, dpid=10900, username="00000001")
+    second = meroshare.MeroShare(name=None, dpid=10900, username="00000002")
+
+    assert first._MeroShare__session.account == "13010900" + "00000001"
+    assert second._MeroShare__session.account == "13010900" + "00000002"
@@ -0,0 +1,54 @@
+import pytest
+
+from files.paging import paginate
+
+
+class Server:
+    def __init__(self, count, send_total=True):
+        self.items = list(range(count))
+        self.send_total = send_total
+        self.pages = []
+
+    def __call__(self, page, size):
+        self.pages.append(page)
+        items = self.items[(page - 1) * size : page * size]
+        return items, len(self.items) if self.send_total else None
+
+
+@pytest.mark.parametrize("prefetch", [False, True])
+@pytest.mark.parametrize("send_total", [True, False])
+@pytest.mark.parametrize(
+    "count, pages",
+    [(0, [1]), (3, [1]), (10, [1]), (25, [1, 2, 3]), (30, [1, 2, 3])],
+)
+def test_every_item_is_yielded_once(prefetch, send_total, count, pages):
+    server = Server(count, send_total)
+
+    assert list(paginate(server, 10, prefetch)) == server.items
+    if send_total or count % 10 or not count:
+        assert server.pages == pages
+    else:
+        # Without a total, a full last page needs one empty page to be sure.
+        assert server.pages == pages + [len(pages) + 1]
+
+
+def test_total_stops_at_an_exact_page():
+    server = Server(20)
+    assert len(list(paginate(server, 10))) == 20
+    assert server.pages == [1, 2]
+
+
+def test_a_server_ignoring_the_page_size_still_ends():
+    # Fewer items than asked for is taken as the last page.
+    def fetch(page, size):
+        return [page] * 5, None
+
+    assert list(paginate(fetch, 10)) == [1] * 5
+
+
+def test_stopping_early_fetches_no_more_pages():
+    server = Server(100)
+    items = paginate(server, 10)
+    assert [next(items) for _ in range(15)] == list(range(15))
+    items.close()
+    assert server.pages == [1, 2]
@@ -0,0 +1,112 @@
+import socket
+
+import pytest
+import requests
+from urllib3.exceptions import NewConnectionError, ProtocolError
+
+from files import mock_server, retry_policy
+
+
+@pytest.fixture
+def server():
+    server = mock_server.start(state=mock_server.MockState(retry_after=0.01))
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture(autouse=True)
+def budget():
+    retry_policy.budget_.reset()
+    yield retry_policy.budget_
+    retry_policy.budget_.reset()
+
+
+def closed_port():
+    with socket.socket() as listener:
+        listener.bind(("127.0.0.1", 0))
+        return listener.getsockname()[1]
+
+
+def refused():
+    try:
+        requests.post(f"http://127.0.0.1:{closed_port()}/", timeout=1)
+    except requests.ConnectionError as error:
+        return error
+    pytest.fail("expected the connection to be refused")
+
+
+def reset():
+    # What requests raises when the connection drops after sending.
+    cause = ProtocolError("Connection aborted.", ConnectionResetError(104, "reset"))
+    return requests.ConnectionError(cause)
+
+
+def response(status, headers=None):
+    response = requests.Response()
+    response.status_code = status
+    response.headers.update(headers or {})
+    return response
+
+
+def test_connection_errors_are_retried_for_idempotent_requests():
+    assert retry_policy.is_retryable(reset(), idempotent=True)
+    assert retry_policy.is_retryable(requests.ReadTimeout(), idempotent=True)
+
+
+def test_requests_that_never_left_are_retried_for_any_request():
+    assert retry_policy.is_retryable(refused(), idempotent=False)
+    assert retry_policy.is_retryable(requests.ConnectTimeout(), idempotent=False)
+    wrapped = requests.ConnectionError(NewConnectionError(None, "refused"))
+    assert retry_policy.is_retryable(wrapped, idempotent=False)
+
+
+def test_requests_that_may_have_arrived_are_not_retried_when_not_idempotent():
+    assert not retry_policy.is_retryable(reset(), idempotent=False)
+    assert not retry_policy.is_retryable(requests.ReadTimeout(), idempotent=False)
+
+
+@pytest.mark.parametrize(
+    "status, idempotent, retried",
+    [
+        (429, False, True),
+        (503, False, True),
+        (500, False, False),
+        (502, False, False),
+        (500, True, True),
+    ],
+)
+def test_statuses(status, idempotent, retried):
+    error = retry_policy.RetryableError(response(status))
+    assert retry_policy.is_retryable(error, idempotent) == retried
+
+
+def test_other_errors_are_not_retried():
+    assert not retry_policy.is_retryable(ValueError("bad JSON"))
+
+
+@pytest.mark.parametrize("value, seconds", [("2", 2.0), ("-1", 0.0), ("", None)])
+def test_parse_retry_after(value, seconds):
+    assert retry_policy.parse_retry_after(value) == seconds
+
+
+def test_throttled_apply_is_retried_and_last_response_returned(server):
+    server.state.throttle_rate = 1.0
+    url = mock_server.base_url(server) + "/meroShare/applicantForm/share/apply"
+
+    answer = retry_policy.call(requests.post, url, json={}, idempotent=False)
+
+    assert answer.status_code == 429
+    assert server.state.calls["/meroShare/applicantForm/share/apply"] == (
+        retry_policy.attempts_
+    )
+
+
+def test_retry_budget_stops_retries(server, budget):
+    server.state.throttle_rate = 1.0
+    url = mock_server.base_url(server) + "/meroShare/applicantForm/share/apply"
+    budget.used = budget.limit
+
+    retry_policy.call(requests.post, url, json={}, idempotent=False)
+
+    assert server.state.calls["/meroShare/applicantForm/share/apply"] == 1
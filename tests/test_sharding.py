@@ -0,0 +1,75 @@
+import os
+
+import pytest
+
+from files import sharding, sinks
+from files.credentials import Account
+
+columns = ["Client ID", "Name", "Demat", "Status"]
+
+
+def account(serial, username):
+    return Account(
+        serial + 1,
+        [serial, f"Client {serial}", "YES", "YES", username, 13010900, "", "", "", ""],
+    )
+
+
+@pytest.fixture
+def accounts():
+    return [account(serial, f"{serial:08d}") for serial in range(1, 7)]
+
+
+def write_parts(name, accounts, shards, extra=()):
+    for shard in range(1, shards + 1):
+        sink = sinks.open_sink(
+            "jsonl", sharding.part_name(name, shard, shards), columns
+        )
+        for item in sharding.select(accounts, shard, shards):
+            sink.write([item.serial, item.name, item.demat, "OK"])
+        if shard == 1:
+            for row in extra:
+                sink.write(row)
+        sink.close()
+    return sharding.part_paths(name, shards)
+
+
+def test_merge_puts_rows_in_list_order(tmp_path, accounts):
+    name = os.path.join(tmp_path, "status")
+    paths = write_parts(name, accounts, 3)
+
+    assert sharding.merge(paths, accounts, name, "jsonl") == len(accounts)
+
+    merged_columns, rows = sinks.read_json_lines(name + ".jsonl")
+    assert merged_columns == columns
+    assert [row[2] for row in rows] == [item.demat for item in accounts]
+
+
+def test_merge_keeps_unknown_rows_last(tmp_path, accounts):
+    name = os.path.join(tmp_path, "status")
+    stranger = [99, "Stranger", "1301090099999999", "OK"]
+    paths = write_parts(name, accounts, 2, extra=[stranger])
+
+    sharding.merge(paths, accounts, name, "jsonl")
+
+    _, rows = sinks.read_json_lines(name + ".jsonl")
+    assert rows[-1] == stranger
+    assert [row[2] for row in rows[:-1]] == [item.demat for item in accounts]
+
+
+def test_merge_refuses_missing_shards(tmp_path, accounts):
+    name = os.path.join(tmp_path, "status")
+    paths = write_parts(name, accounts, 3)
+
+    with pytest.raises(ValueError, match="Missing shards: 2"):
+        sharding.merge([paths[0], paths[2]], accounts, name, "jsonl")
+
+
+def test_every_account_lands_in_exactly_one_shard(accounts):
+    for by in ("hash", "range"):
+        selected = [
+            item.demat
+            for shard in range(1, 4)
+            for item in sharding.select(accounts, shard, 3, by)
+        ]
+        assert sorted(selected) == sorted(item.demat for item in accounts)
@@ -0,0 +1,94 @@
+import os
+
+import pytest
+
+from files import snapshots
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = snapshots.SnapshotStore(os.path.join(tmp_path, "snapshots.sqlite3"))
+    yield store
+    store.close()
+
+
+def rows(demat, balances):
+    return [
+        (demat[-1], f"Client {demat[-1]}", demat, scrip, current, free)
+        for scrip, (current, free) in balances.items()
+    ]
+
+
+def changes(result):
+    return {(row[2], row[3]): row[4] for row in result}
+
+
+def test_diff_classifies_changes(store):
+    store.record("1", rows("1", {"ABC": (10, 10), "XYZ": (5, 5), "OLD": (1, 1)}), "d1")
+    store.record("1", rows("1", {"ABC": (20, 20), "XYZ": (5, 4), "NEW": (3, 3)}), "d2")
+
+    result = snapshots.diff("d1", "d2", ["1"], store)
+
+    assert changes(result) == {
+        ("1", "ABC"): "Changed",
+        ("1", "XYZ"): "Changed",
+        ("1", "OLD"): "Removed",
+        ("1", "NEW"): "New",
+    }
+    row = next(row for row in result if row[3] == "ABC")
+    assert row[5:] == [10, 20, 10, 20, 10]
+
+
+def test_diff_reports_free_balance_that_differs(store):
+    store.record("1", rows("1", {"ABC": (10, 8)}), "d1")
+    store.record("1", rows("1", {"ABC": (10, 8)}), "d2")
+
+    assert changes(snapshots.diff("d1", "d2", ["1"], store)) == {
+        ("1", "ABC"): "Free Differs"
+    }
+
+
+def test_diff_skips_accounts_read_on_one_day_only(store):
+    store.record("1", rows("1", {"ABC": (10, 10)}), "d1")
+    store.record("2", rows("2", {"ABC": (10, 10)}), "d1")
+    store.record("1", rows("1", {"ABC": (20, 20)}), "d2")
+
+    assert changes(snapshots.diff("d1", "d2", ["1", "2"], store)) == {
+        ("1", "ABC"): "Changed"
+    }
+
+
+def test_each_account_is_compared_with_its_own_previous_snapshot(store):
+    demats = ["1", "2", "3"]
+    for demat in demats:
+        store.record(demat, rows(demat, {"ABC": (10, 10), "XYZ": (10, 10)}), "d1")
+    store.record("1", rows("1", {"ABC": (20, 20), "XYZ": (20, 20)}), "d2")
+    for demat in demats:
+        store.record(demat, rows(demat, {"ABC": (30, 30), "XYZ": (30, 30)}), "d3")
+
+    assert store.previous("d3") == {"1": "d2", "2": "d1", "3": "d1"}
+    result = snapshots.diff(None, "d3", demats, store)
+
+    assert len(result) == 6
+    assert {row[2]: row[5] for row in result} == {"1": 20, "2": 10, "3": 10}
+    # An explicit day only compares the accounts read on it.
+    assert len(snapshots.diff("d2", "d3", demats, store)) == 2
+
+
+def test_diff_follows_the_order_of_the_accounts(store):
+    for demat in ("1", "2", "3"):
+        store.record(demat, rows(demat, {"ABC": (1, 1)}), "d1")
+        store.record(demat, rows(demat, {"ABC": (2, 2)}), "d2")
+
+    result = snapshots.diff("d1", "d2", ["3", "1", "2"], store)
+
+    assert [row[2] for row in result] == ["3", "1", "2"]
+
+
+def test_recording_again_replaces_the_days_rows(store):
+    store.record("1", rows("1", {"ABC": (10, 10), "XYZ": (1, 1)}), "d1")
+    store.record("1", rows("1", {"ABC": (10, 10)}), "d1")
+
+    demats, stored = store.load("d1")
+    assert demats == {"1"}
+    assert [row[1] for row in stored] == ["ABC"]
@@ -0,0 +1,111 @@
+import threading
+import time
+
+import pytest
+
+from files import throttle
+
+
+@pytest.fixture
+def breaker():
+    return throttle.CircuitBreaker(window=4, threshold=0.5, cooldown=0.05)
+
+
+def trip(breaker):
+    for success in (True, True, False, False):
+        assert breaker.before() is None
+        breaker.record(success)
+    assert breaker.state == "open"
+
+
+def test_breaker_stays_closed_below_the_threshold(breaker):
+    for success in (True, True, True, False) * 3:
+        breaker.before()
+        breaker.record(success)
+    assert breaker.state == "closed"
+
+
+def test_breaker_waits_out_the_cooldown_then_probes(breaker):
+    trip(breaker)
+    start = time.monotonic()
+    probe = breaker.before()
+
+    assert time.monotonic() - start >= 0.04
+    assert probe is not None
+    assert breaker.state == "half-open"
+
+    breaker.record(True, probe)
+    assert breaker.state == "closed"
+
+
+def test_failed_probe_opens_the_breaker_again(breaker):
+    trip(breaker)
+    probe = breaker.before()
+    breaker.record(False, probe)
+    assert breaker.state == "open"
+
+
+def test_only_the_probe_decides_the_half_open_state(breaker):
+    trip(breaker)
+    probe = breaker.before()
+
+    # Requests let through before the breaker opened, finishing late.
+    breaker.record(True)
+    assert breaker.state == "half-open"
+    breaker.record(False)
+    assert breaker.state == "half-open"
+    breaker.record(True, object())
+    assert breaker.state == "half-open"
+
+    breaker.record(True, probe)
+    assert breaker.state == "closed"
+
+
+def test_one_probe_at_a_time(breaker):
+    trip(breaker)
+    probe = breaker.before()
+    admitted = threading.Event()
+
+    def second():
+        breaker.before()
+        admitted.set()
+
+    threading.Thread(target=second, daemon=True).start()
+    assert not admitted.wait(0.1)
+
+    breaker.record(True, probe)
+    assert admitted.wait(1)
+
+
+def test_rate_limiter_allows_a_burst_then_paces():
+    limiter = throttle.RateLimiter(rate=20, burst=3)
+    start = time.monotonic()
+    for _ in range(5):
+        limiter.wait("host")
+
+    # Three at once, then one every 1/20s.
+    assert 0.08 <= time.monotonic() - start < 0.5
+
+
+def test_rate_limiter_try_wait_does_not_block():
+    limiter = throttle.RateLimiter(rate=1, burst=1)
+    assert limiter.try_wait("host")
+    assert not limiter.try_wait("host")
+    # Every key has its own bucket.
+    assert limiter.try_wait("other")
+
+
+def test_rate_limiter_without_a_rate_never_waits():
+    limiter = throttle.RateLimiter(rate=0)
+    start = time.monotonic()
+    for _ in range(100):
+        limiter.wait("host")
+        assert limiter.try_wait("host")
+    assert time.monotonic() - start < 0.1
+
+
+def test_lowering_the_rate_lowers_the_burst():
+    limiter = throttle.RateLimiter(rate=10)
+    limiter.set_rate(0.5)
+    assert limiter.try_wait("host")
+    assert not limiter.try_wait("host")